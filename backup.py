@@ -0,0 +1,158 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+import asyncio
+import hashlib
+
+
+# -------------------- SAO LƯU LÊN GIT --------------------
+class GitBackup:
+    """Định kỳ commit + push các file dữ liệu lên một git remote, chạy nền.
+
+    Mỗi `interval` giây: gọi `prepare()` (ví dụ ghi hết dữ liệu xuống đĩa), bỏ
+    qua nếu nội dung file không đổi kể từ lần push thành công trước, ngược lại
+    chạy git bằng subprocess bất đồng bộ, mỗi lệnh có `timeout`. Lỗi thì lần sau
+    chờ lâu gấp đôi (tối đa `max_backoff`). remote có thể là URL hoặc đường dẫn
+    tới một bare repo cục bộ.
+    """
+
+    def __init__(self, repo_dir, files, remote, branch='main', interval=600,
+                 timeout=60, max_backoff=3600, prepare=None):
+        self.repo_dir = repo_dir
+        self.files = list(files)
+        self.remote = remote
+        self.branch = branch
+        self.interval = interval
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.prepare = prepare
+        self.pushes = 0
+        self.skipped = 0
+        self.failures = 0
+        self.last_error = None
+        self._last_digest = None
+
+    def _digest(self):
+        h = hashlib.sha256()
+        for name in self.files:
+            path = os.path.join(self.repo_dir, name)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b''):
+                        h.update(chunk)
+        return h.hexdigest()
+
+    def _mask(self, text):
+        # không để token trong URL remote lọt ra log
+        return text.replace(self.remote, '<remote>')
+
+    async def _git(self, *args):
+        proc = await asyncio.create_subprocess_exec(
+            'git', *args, cwd=self.repo_dir,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+        try:
+            out, _ = await asyncio.wait_for(proc.communicate(), self.timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise RuntimeError(f"git {args[0]} quá {self.timeout}s")
+        return proc.returncode, out.decode('utf-8', 'replace')
+
+    async def backup_once(self):
+        """Sao lưu một lần. Trả về True nếu đã push, False nếu bỏ qua vì không có gì đổi."""
+        if self.prepare:
+            await self.prepare()
+        loop = asyncio.get_running_loop()
+        digest = await loop.run_in_executor(None, self._digest)
+        if digest == self._last_digest:
+            self.skipped += 1
+            return False
+
+        now = time.strftime("%Y-%m-%d %H:%M:%S")
+        identity = ['-c', 'user.email=bot@render.com', '-c', 'user.name=Render Bot']
+        # -f: file dữ liệu có thể nằm trong .gitignore (vd. /players.db*)
+        rc, out = await self._git('add', '-f', '--', *self.files)
+        if rc != 0:
+            raise RuntimeError(self._mask(out.strip()))
+        rc, out = await self._git(*identity, 'commit', '-m', f"Auto save at {now}", '--', *self.files)
+        # "nothing to commit" vẫn push tiếp: có thể lần trước commit xong nhưng push lỗi
+        if rc != 0 and 'nothing' not in out:
+            raise RuntimeError(self._mask(out.strip()))
+        rc, out = await self._git('push', self.remote, f"HEAD:{self.branch}")
+        if rc != 0:
+            raise RuntimeError(self._mask(out.strip()))
+        self._last_digest = digest
+        self.pushes += 1
+        return True
+
+    async def run(self):
+        delay = self.interval
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                if await self.backup_once():
+                    print("✅ Saved to GitHub successfully!")
+                self.last_error = None
+                delay = self.interval
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                delay = min(delay * 2, self.max_backoff)
+                print(f"⚠️ Save to GitHub failed: {e} (thử lại sau {delay}s)")
+
+
+# -------------------- KIỂM TRA VỚI BARE REPO CỤC BỘ --------------------
+def self_check():
+    """Sao lưu một file bị .gitignore bỏ qua lên bare repo tạm: push, bỏ qua khi
+    không đổi, push lại khi đổi. Trả về danh sách lỗi (rỗng nếu đạt)."""
+    workdir = tempfile.mkdtemp(prefix='bot-backup-')
+    repo = os.path.join(workdir, 'repo')
+    remote = os.path.join(workdir, 'remote.git')
+    data = os.path.join(repo, 'players.db')
+    failures = []
+
+    def git(*args, cwd=repo):
+        return subprocess.run(['git', *args], cwd=cwd, capture_output=True, text=True, check=True).stdout
+
+    try:
+        os.makedirs(repo)
+        git('init', '-q', '--bare', remote, cwd=workdir)
+        git('init', '-q')
+        with open(os.path.join(repo, '.gitignore'), 'w') as f:
+            f.write('/players.db*\n')
+        with open(data, 'w') as f:
+            f.write('v1')
+        backup = GitBackup(repo, ['players.db'], remote)
+        results = [asyncio.run(backup.backup_once()), asyncio.run(backup.backup_once())]
+        with open(data, 'w') as f:
+            f.write('v2')
+        results.append(asyncio.run(backup.backup_once()))
+        if results != [True, False, True]:
+            failures.append(f"push/bỏ qua/push mong đợi [True, False, True], nhận {results}")
+        if (backup.pushes, backup.skipped) != (2, 1):
+            failures.append(f"pushes={backup.pushes} skipped={backup.skipped}")
+        commits = git('rev-list', '--count', 'main', cwd=remote).strip()
+        content = git('show', 'main:players.db', cwd=remote)
+        if commits != '2' or content != 'v2':
+            failures.append(f"remote có {commits} commit, players.db = {content!r}")
+    except (subprocess.CalledProcessError, RuntimeError) as e:
+        failures.append(str(getattr(e, 'stderr', None) or e))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return failures
+
+
+if __name__ == '__main__':
+    # python backup.py check
+    if len(sys.argv) < 2 or sys.argv[1] != 'check':
+        print("Cách dùng: python backup.py check")
+        sys.exit(1)
+    failures = self_check()
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Sao lưu lên bare repo cục bộ: push, bỏ qua khi không đổi, push lại khi đổi.")
+    sys.exit(1 if failures else 0)
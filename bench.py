@@ -0,0 +1,487 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from contextlib import asynccontextmanager
+try:
+    import resource  # không có trên Windows
+except ImportError:
+    resource = None
+
+
+# -------------------- BENCHMARK OFFLINE --------------------
+# Chạy các lệnh thật của bot.py (callback của lệnh và on_message) qua các đối
+# tượng Context/Message/Channel giả, không kết nối Discord. Mỗi kịch bản chạy
+# trong một process riêng với save.txt giả lập nên số người chơi và trạng thái
+# không lẫn giữa các kịch bản.
+#
+#   python bench.py                          chạy hết, so với bench_baseline.json
+#   python bench.py --players 10000,1000000  thêm kích thước save
+#   python bench.py --backend sqlite         dùng players.db (cache người chơi có giới hạn)
+#   python bench.py --save-baseline          ghi kết quả làm baseline mới
+#   python bench.py --scenarios stress       chỉ chạy kiểm tra tổng tiền khi chuyển / cược / trả thưởng đồng thời
+#
+# Thoát với mã 1 nếu có chỉ số chậm hơn baseline quá --tolerance hoặc tổng tiền bị lệch.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(BASE_DIR, 'bench_baseline.json')
+RESULT_MARK = 'BENCH_RESULT '
+FIRST_ID = 100000000000000000  # id người chơi giả: FIRST_ID + i
+START_POCKET = 100000 * 100    # cents, đủ cho mọi lệnh trong kịch bản
+BURSTS = 5                     # số đợt give đồng thời, lấy trung vị throughput
+
+
+# -------------------- ĐỐI TƯỢNG DISCORD GIẢ --------------------
+class FakeUser:
+    def __init__(self, user_id, name=None):
+        self.id = user_id
+        self.display_name = name or f"user{user_id % 100000}"
+        self.mention = f"<@{user_id}>"
+        self.bot = False
+
+
+class FakeChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.sent = 0
+
+    async def send(self, content=None, **kwargs):
+        self.sent += 1
+
+
+class FakeContext:
+    def __init__(self, channel, author):
+        self.channel = channel
+        self.author = author
+        self.send = channel.send
+
+
+class FakeMessage:
+    def __init__(self, channel, author, content):
+        self.channel = channel
+        self.author = author
+        self.content = content
+        self.guild = None
+        self._state = None
+
+
+# -------------------- ĐO --------------------
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def summarize(samples, elapsed=None):
+    """Tóm tắt các mẫu (giây): p50/p99 tính bằng ms, throughput là số lệnh mỗi giây."""
+    if not samples:
+        return {'n': 0}
+    elapsed = elapsed if elapsed is not None else sum(samples)
+    return {
+        'n': len(samples),
+        'p50_ms': percentile(samples, 0.5) * 1000,
+        'p99_ms': percentile(samples, 0.99) * 1000,
+        'ops_s': len(samples) / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+async def timed(samples, coro):
+    t0 = time.perf_counter()
+    await coro
+    samples.append(time.perf_counter() - t0)
+    # nhường event loop cho outbox và các task nền như khi chạy thật
+    await asyncio.sleep(0)
+
+
+def player_id(i):
+    return FIRST_ID + i
+
+
+# -------------------- KỊCH BẢN --------------------
+async def bench_wordchain(app, args):
+    """Các lượt nối từ hợp lệ trên toàn bộ text2.txt, cộng tin nhắn thường ở kênh không có ván."""
+    channel = FakeChannel(1)
+    quiet = FakeChannel(2)
+    authors = [FakeUser(player_id(i)) for i in range(min(args.players, 50))]
+    turns, chatter = [], []
+    games = 0
+    t0 = time.perf_counter()
+    session = None
+    while len(turns) < args.turns:
+        if session is None or not session.active:
+            await app.start.callback(FakeContext(channel, authors[0]))
+            session = app.word_sessions.get(channel.id)
+            games += 1
+        word = session.used_words.pick(app.word_index.last_syllable(session.last_word))
+        if word is None:
+            # người chơi hết từ để nối, bắt đầu ván mới
+            await app.stop.callback(FakeContext(channel, authors[0]))
+            continue
+        author = authors[len(turns) % len(authors)]
+        await timed(turns, app.on_message(FakeMessage(channel, author, word)))
+    turn_elapsed = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for i in range(args.turns):
+        await timed(chatter, app.on_message(FakeMessage(quiet, authors[i % len(authors)], "chào mọi người")))
+    chatter_elapsed = time.perf_counter() - t0
+    return {
+        'wordchain_turn': summarize(turns, turn_elapsed),
+        'wordchain_chatter': summarize(chatter, chatter_elapsed),
+        'info': {'games': games, 'words': len(app.word_index)},
+    }
+
+
+async def bench_taixiu(app, args):
+    """args.rounds vòng, mỗi vòng args.bettors người cược rồi trả thưởng qua RoundScheduler."""
+    bettors = min(args.bettors, args.players)
+    choices = app.VALID_CHOICES
+    bets, settles = [], []
+    for r in range(args.rounds):
+        channel = FakeChannel(1000 + r)
+        for i in range(bettors):
+            ctx = FakeContext(channel, FakeUser(player_id(i)))
+            await timed(bets, app.taixiu.callback(ctx, random.choice(choices), '1'))
+        # đóng vòng như task của scheduler khi tới hạn
+        rnd = app.taixiu_rounds.rounds.pop(channel.id)
+        await timed(settles, app.taixiu_rounds._close(rnd))
+    return {
+        'taixiu_bet': summarize(bets),
+        'taixiu_settle': summarize(settles),
+        'info': {'bettors': bettors, 'rounds': args.rounds},
+    }
+
+
+async def bench_economy(app, args):
+    """Chuỗi buy/eat/give trên người chơi ngẫu nhiên, một đợt give đồng thời để
+    kiểm tra tổng tiền không đổi, rồi một lần flush xuống backend."""
+    rng = random.Random(1)
+    items = list(app.shop_items)
+    channel = FakeChannel(3)
+    buys, eats, gives = [], [], []
+    for _ in range(args.ops):
+        user = FakeUser(player_id(rng.randrange(args.players)))
+        other = FakeUser(player_id(rng.randrange(args.players)))
+        item = rng.choice(items)
+        ctx = FakeContext(channel, user)
+        await timed(buys, app.buy.callback(ctx, item_name=item))
+        await timed(eats, app.eat.callback(ctx, item_name=item))
+        if other.id != user.id:
+            await timed(gives, app.give.callback(ctx, other, '1'))
+
+    # give đồng thời trong một nhóm nhỏ để các lệnh tranh lock của nhau
+    group = [FakeUser(player_id(i)) for i in range(min(args.players, 200))]
+    ids = [str(u.id) for u in group]
+    before = sum(app.get_player(i).pocket for i in ids)
+    bursts = []
+    for _ in range(BURSTS):
+        tasks = []
+        for _ in range(args.ops // BURSTS):
+            a, b = rng.sample(group, 2)
+            tasks.append(app.give.callback(FakeContext(channel, a), b, str(rng.randint(1, 50))))
+        t1 = time.perf_counter()
+        await asyncio.gather(*tasks)
+        bursts.append(len(tasks) / (time.perf_counter() - t1))
+    after = sum(app.get_player(i).pocket for i in ids)
+
+    dirty = len(app.store.dirty)
+    t1 = time.perf_counter()
+    await app.store.flush()
+    flush_s = time.perf_counter() - t1
+    app.store.evict()
+    return {
+        'economy_buy': summarize(buys),
+        'economy_eat': summarize(eats),
+        'economy_give': summarize(gives),
+        'economy_give_burst': {'n': BURSTS, 'ops_s': percentile(bursts, 0.5)},
+        'economy_flush': {'n': dirty, 'p50_ms': flush_s * 1000},
+        'info': {'conserved': before == after, 'resident': len(app.players)},
+    }
+
+
+async def bench_stress(app, args):
+    """Chuyển tiền, đặt cược và trả thưởng đồng thời qua app.economy trên một nhóm
+    nhỏ (mỗi stripe lock có vài người chơi nên các lệnh tranh lock của nhau).
+    Tiền của mỗi đợt cược được trả hết cho người thắng trong đợt, nên tổng ví cộng
+    tiền đang cược phải bằng tổng ban đầu."""
+    rng = random.Random(2)
+    economy = app.economy
+    ids = [str(player_id(i)) for i in range(min(args.players, 2 * app.PLAYER_LOCK_STRIPES))]
+    before = sum(app.get_player(i).pocket for i in ids)
+    pending = []  # (user_id, tiền cược) đã trừ nhưng chưa trả thưởng
+    samples = []
+    contended = 0
+    locks = economy.locks
+    acquire = locks.acquire
+
+    @asynccontextmanager
+    async def yielding_acquire(*keys):
+        # nhường event loop khi đang giữ lock để lệnh khác trên cùng stripe thật sự phải chờ
+        nonlocal contended
+        contended += any(locks.lock(k).locked() for k in keys)
+        async with acquire(*keys):
+            await asyncio.sleep(0)
+            yield
+
+    async def settle_some():
+        batch = [pending.pop(rng.randrange(len(pending))) for _ in range(min(len(pending), rng.randint(1, 20)))]
+        if not batch:
+            return
+        pot = sum(amount for _, amount in batch)
+        winners = {}
+        for user_id, amount in batch:
+            share = rng.randint(0, pot)
+            winners[user_id] = winners.get(user_id, 0) + share
+            pot -= share
+        winners[batch[0][0]] += pot
+        await economy.credit(winners)
+
+    async def bet(user_id, amount):
+        status, _ = await economy.bet(user_id, amount, app.MAX_BET)
+        if status == 'ok':
+            pending.append((user_id, amount))
+
+    async def worker():
+        for _ in range(args.ops // 10):
+            op = rng.random()
+            if op < 0.5:
+                a, b = rng.sample(ids, 2)
+                coro = economy.transfer(a, b, rng.randint(1, 5000))
+            elif op < 0.85:
+                coro = bet(rng.choice(ids), rng.randint(1, 5000))
+            else:
+                coro = settle_some()
+            await timed(samples, coro)
+
+    locks.acquire = yielding_acquire
+    try:
+        t1 = time.perf_counter()
+        # thứ tự lấy lock sai sẽ deadlock, wait_for biến nó thành lỗi
+        await asyncio.wait_for(asyncio.gather(*(worker() for _ in range(50))), 60)
+        elapsed = time.perf_counter() - t1
+    finally:
+        locks.acquire = acquire
+    open_stakes = sum(amount for _, amount in pending)
+    after = sum(app.get_player(i).pocket for i in ids)
+    return {
+        'stress_mixed': summarize(samples, elapsed),
+        'info': {'conserved': after + open_stakes == before, 'open_bets': len(pending), 'players': len(ids),
+                 'contended': contended},
+    }
+
+
+async def bench_startup(app, args):
+    return {'info': {'players_loaded': len(app.players)}}
+
+
+SCENARIOS = {
+    'startup': bench_startup,
+    'wordchain': bench_wordchain,
+    'taixiu': bench_taixiu,
+    'economy': bench_economy,
+    'stress': bench_stress,
+}
+
+
+async def run_scenario(app, args):
+    # vòng ghi nền chạy như khi bot chạy thật (setup_hook)
+    saver = asyncio.create_task(app.store.run())
+    try:
+        return await SCENARIOS[args.worker](app, args)
+    finally:
+        saver.cancel()
+
+
+def run_worker(args):
+    """Chạy trong process con: nạp bot.py với save giả rồi chạy một kịch bản."""
+    sys.path.insert(0, BASE_DIR)
+    t0 = time.perf_counter()
+    import bot as app
+    import_s = time.perf_counter() - t0
+    # process_commands so sánh tác giả với bot.user, khi không đăng nhập thì user là None
+    app.bot._connection.user = FakeUser(1, 'bench-bot')
+    random.seed(0)
+    result = asyncio.run(run_scenario(app, args))
+    if args.worker == 'startup':
+        result['startup'] = {'n': 1, 'p50_ms': import_s * 1000}
+    result['info']['recovery_ms'] = app.store.recovery['seconds'] * 1000
+    if resource is not None:
+        result['info']['maxrss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(RESULT_MARK + json.dumps(result))
+
+
+# -------------------- SAVE GIẢ LẬP --------------------
+def make_save(path, count):
+    """save.txt với `count` người chơi theo đúng cấu trúc của get_player."""
+    now = int(time.time())
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{')
+        for i in range(count):
+            player = {
+                "pocket": START_POCKET, "exp": i % 20, "level": 1 + i % 7, "combo": 0,
+                "inventory": {"nước": 1} if i % 3 == 0 else {},
+                "hunger": 5, "thirst": 5, "last_status_ts": now,
+            }
+            f.write(('' if i == 0 else ',') + json.dumps(str(player_id(i))) + ':' + json.dumps(player, ensure_ascii=False))
+        f.write('}')
+
+
+def spawn(scenario, save_path, args, workdir):
+    """Chạy một kịch bản trong process con, trả về (kết quả, thời gian tổng của process)."""
+    # mỗi lần chạy dùng bản sao riêng vì kịch bản ghi journal cạnh save (hoặc ghi vào db)
+    run_save = os.path.join(workdir, f"{scenario}-{os.path.basename(save_path)}")
+    run_db = run_save + '.db'
+    for path in (run_save, run_save + '.journal', run_db, run_db + '-wal', run_db + '-shm'):
+        if os.path.exists(path):
+            os.remove(path)
+    if args.backend == 'sqlite':
+        shutil.copyfile(save_path + '.db', run_db)
+    else:
+        try:
+            os.link(save_path, run_save)
+        except OSError:
+            shutil.copyfile(save_path, run_save)
+    env = dict(os.environ, SAVE_FILE=run_save, SQLITE_FILE=run_db, STORAGE_BACKEND=args.backend,
+               BOT_TOKEN='', BACKUP_REMOTE='', GITHUB_USER='', GITHUB_TOKEN='', METRICS_PORT='0',
+               PYTHONDONTWRITEBYTECODE='1')
+    cmd = [sys.executable, os.path.abspath(__file__), '--worker', scenario,
+           '--players', str(args.players_now), '--turns', str(args.turns), '--bettors', str(args.bettors),
+           '--rounds', str(args.rounds), '--ops', str(args.ops)]
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, env=env, cwd=workdir, capture_output=True, text=True)
+    wall = time.perf_counter() - t0
+    for line in proc.stdout.splitlines():
+        if line.startswith(RESULT_MARK):
+            return json.loads(line[len(RESULT_MARK):]), wall
+    raise RuntimeError(f"Kịch bản {scenario} lỗi:\n{proc.stdout}\n{proc.stderr}")
+
+
+# -------------------- BÁO CÁO / BASELINE --------------------
+def flatten(results):
+    """{'economy@10000': {'economy_buy': {...}}} -> {'economy@10000/economy_buy/p50_ms': x, ...}"""
+    flat = {}
+    for run, metrics in results.items():
+        for name, stats in metrics.items():
+            if name == 'info':
+                continue
+            for key in ('p50_ms', 'p99_ms', 'ops_s'):
+                if key in stats:
+                    flat[f"{run}/{name}/{key}"] = stats[key]
+    return flat
+
+
+def compare(flat, baseline, tolerance):
+    """Các chỉ số tệ hơn baseline quá tolerance (tỉ lệ): độ trễ tăng hoặc throughput giảm."""
+    regressions = []
+    for key, value in sorted(flat.items()):
+        old = baseline.get(key)
+        if not old:
+            continue
+        ratio = value / old if key.endswith('_ms') else old / value if value else float('inf')
+        if ratio > 1 + tolerance:
+            regressions.append((key, old, value, ratio))
+    return regressions
+
+
+def print_report(results):
+    print(f"{'kịch bản':<40}{'n':>8}{'p50 ms':>11}{'p99 ms':>11}{'lệnh/s':>12}")
+    for run, metrics in results.items():
+        for name, stats in metrics.items():
+            if name == 'info':
+                continue
+            cells = [f"{stats[k]:.3f}" if k in stats else '-' for k in ('p50_ms', 'p99_ms')]
+            ops = f"{stats['ops_s']:,.0f}" if 'ops_s' in stats else '-'
+            print(f"{run + '/' + name:<40}{stats.get('n', 0):>8}{cells[0]:>11}{cells[1]:>11}{ops:>12}")
+        info = metrics.get('info')
+        if info:
+            print(f"  {run}: " + ', '.join(f"{k}={v:.1f}" if isinstance(v, float) else f"{k}={v}" for k, v in info.items()))
+
+
+def main(args):
+    sizes = [int(x) for x in args.players.split(',')]
+    scenarios = args.scenarios.split(',')
+    workdir = tempfile.mkdtemp(prefix='bot-bench-')
+    results = {}
+    try:
+        for size in sizes:
+            args.players_now = size
+            save_path = os.path.join(workdir, f"save-{size}.txt")
+            t0 = time.perf_counter()
+            make_save(save_path, size)
+            print(f"📄 save giả lập {size:,} người chơi ({os.path.getsize(save_path) / 1e6:.1f} MB, {time.perf_counter() - t0:.1f}s)")
+            if args.backend == 'sqlite':
+                sys.path.insert(0, BASE_DIR)
+                from storage import migrate_json_to_sqlite
+                migrate_json_to_sqlite(save_path, save_path + '.db')
+            run_suffix = f"@{size}" if args.backend == 'json' else f"@{size}+{args.backend}"
+            for scenario in scenarios:
+                if scenario == 'startup':
+                    # khởi động nguội: cả process Python + import bot.py, lấy trung vị của nhiều lần
+                    walls, runs = [], []
+                    for _ in range(args.repeat):
+                        result, wall = spawn(scenario, save_path, args, workdir)
+                        walls.append(wall)
+                        runs.append(result)
+                    result = runs[len(runs) // 2]
+                    result['process'] = {'n': len(walls), 'p50_ms': percentile(walls, 0.5) * 1000}
+                else:
+                    result, _ = spawn(scenario, save_path, args, workdir)
+                results[scenario + run_suffix] = result
+            for path in (save_path, save_path + '.db'):
+                if os.path.exists(path):
+                    os.remove(path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(results)
+    broken = [run for run, m in results.items() if m.get('info', {}).get('conserved') is False]
+    if broken:
+        print(f"❌ Tổng tiền thay đổi sau các lệnh đồng thời: {', '.join(broken)}")
+        return 1
+    flat = flatten(results)
+    if args.save_baseline:
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(flat, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"💾 Đã ghi baseline vào {os.path.basename(BASELINE_FILE)}")
+        return 0
+    if not os.path.exists(BASELINE_FILE):
+        print("ℹ️ Chưa có baseline, chạy lại với --save-baseline để tạo.")
+        return 0
+    with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(flat, baseline, args.tolerance)
+    for key, old, new, ratio in regressions:
+        print(f"🐢 {key}: {old:.3f} -> {new:.3f} (tệ hơn {ratio:.2f}x)")
+    print("✅ Không có chỉ số nào chậm hơn baseline." if not regressions else f"❌ {len(regressions)} chỉ số chậm hơn baseline.")
+    return 1 if regressions else 0
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark offline cho bot.py")
+    parser.add_argument('--players', default='10000,100000', help="số người chơi trong save giả lập, cách nhau bởi dấu phẩy")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--backend', choices=['json', 'sqlite'], default='json')
+    parser.add_argument('--turns', type=int, default=2000, help="số lượt nối từ")
+    parser.add_argument('--bettors', type=int, default=500, help="số người cược mỗi vòng tài xỉu")
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--ops', type=int, default=2000, help="số lượt buy/eat/give")
+    parser.add_argument('--repeat', type=int, default=3, help="số lần đo khởi động")
+    parser.add_argument('--tolerance', type=float, default=1.0, help="cho phép chậm hơn baseline bao nhiêu (1.0 = gấp đôi)")
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--worker', choices=list(SCENARIOS), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.worker:
+        args.players = int(args.players)
+    return args
+
+
+if __name__ == '__main__':
+    args = parse_args(sys.argv[1:])
+    if args.worker:
+        run_worker(args)
+    else:
+        sys.exit(main(args))
@@ -0,0 +1,91 @@
+import io
+import csv
+import time
+import asyncio
+
+from money import INF_POCKET, parse_money, fmt_plain
+
+
+# -------------------- THAO TÁC HÀNG LOẠT --------------------
+# Lệnh admin đổi tiền cho nhiều người, xuất/nhập CSV và lượt trừ đói/khát hằng
+# ngày đều chạy qua run_batched(): mỗi lô BATCH_SIZE người chơi được xử lý trong
+# một lần giữ lock rồi nhường event loop, tiến độ được báo mỗi PROGRESS_SECONDS.
+# Việc ghi xuống đĩa do PlayerStore.batch() gom lại thành một lần ở cuối.
+BATCH_SIZE = 500
+PROGRESS_SECONDS = 2.0
+CSV_FIELDS = ('user_id', 'pocket', 'level', 'exp', 'hunger', 'thirst')
+
+
+class Progress:
+    """Gọi report(text) với tiến độ `label`, nhiều nhất mỗi `every` giây (trừ lần cuối)."""
+
+    def __init__(self, label, total, report, every=PROGRESS_SECONDS):
+        self.label = label
+        self.total = total
+        self.report = report
+        self.every = every
+        self._last = time.monotonic()
+
+    async def update(self, done, final=False):
+        now = time.monotonic()
+        if not final and now - self._last < self.every:
+            return
+        self._last = now
+        pct = 100 * done // self.total if self.total else 100
+        await self.report(f"{self.label}: {done:,}/{self.total:,} ({pct}%)")
+
+
+async def run_batched(items, apply, lock=None, batch=BATCH_SIZE, progress=None):
+    """Gọi apply(item) cho từng phần tử, trả về số lần apply() trả về giá trị đúng.
+
+    lock(lô) trả về async context manager được giữ trong lúc xử lý một lô (vd.
+    player_locks.acquire trên id của lô); giữa hai lô event loop được nhường.
+    """
+    items = list(items)
+    changed = 0
+    for start in range(0, len(items), batch):
+        chunk = items[start:start + batch]
+        if lock is None:
+            changed += sum(1 for item in chunk if apply(item))
+        else:
+            async with lock(chunk):
+                changed += sum(1 for item in chunk if apply(item))
+        await asyncio.sleep(0)
+        if progress is not None:
+            await progress.update(start + len(chunk))
+    if progress is not None:
+        await progress.update(len(items), final=True)
+    return changed
+
+
+# -------------------- CSV SỐ DƯ --------------------
+def export_row(user_id, player):
+    return (user_id, fmt_plain(player.pocket), player.level, player.exp, player.hunger, player.thirst)
+
+
+def parse_balances(text):
+    """CSV (user_id, pocket[, ...]) -> ([(user_id, cents)], [số dòng lỗi]).
+
+    Dòng tiêu đề và các cột sau pocket được bỏ qua; pocket theo đơn vị xu như
+    lúc xuất ra, chấp nhận 'inf'. Id trùng thì lấy dòng sau cùng.
+    """
+    rows = {}
+    errors = []
+    for line_no, row in enumerate(csv.reader(io.StringIO(text)), 1):
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        user_id = row[0].strip()
+        if line_no == 1 and not user_id.isdigit():
+            continue  # tiêu đề
+        try:
+            if not user_id.isdigit() or len(row) < 2:
+                raise ValueError(user_id)
+            amount = row[1].strip()
+            cents = INF_POCKET if amount.lower() == 'inf' else parse_money(amount)
+            if cents < 0:
+                raise ValueError(amount)
+        except ValueError:
+            errors.append(line_no)
+            continue
+        rows[user_id] = cents
+    return list(rows.items()), errors
@@ -0,0 +1,400 @@
+import os
+import mmap
+import random
+import struct
+import zlib
+from array import array
+
+
+# -------------------- TỪ ĐIỂN BIÊN DỊCH SẴN --------------------
+# text2.txt được biên dịch thành một file nhị phân (text2.dict) rồi mmap lúc khởi động.
+# Bố cục (mọi mảng là uint32, đánh số từ theo thứ tự đã sắp xếp):
+#   header
+#   word_offsets[n+1]   vị trí từng từ trong word_blob
+#   word_first[n]       id âm tiết đầu của từ
+#   word_last[n]        id âm tiết cuối của từ
+#   word_edge[n]        id cạnh của từ (xem dưới)
+#   syl_offsets[s+1]    vị trí từng âm tiết trong syl_blob
+#   syl_start[s+1]      khoảng [syl_start[i], syl_start[i+1]) trong by_first
+#   syl_edges[s+1]      khoảng các cạnh đi ra từ âm tiết i
+#   edge_target[e]      âm tiết cuối của cạnh
+#   edge_start[e+1]     khoảng trong by_first của các từ thuộc cạnh
+#   by_first[n]         id các từ gom theo âm tiết đầu, rồi theo âm tiết cuối
+#   slots[t]            bảng băm địa chỉ mở cho từ: id + 1, 0 là ô trống
+#   syl_slots[u]        bảng băm tương tự cho âm tiết
+#   word_blob, syl_blob chuỗi utf-8 nối liền
+# Đồ thị nối từ: đỉnh là âm tiết, mỗi cạnh (âm tiết đầu -> âm tiết cuối) gom
+# mọi từ có cùng cặp âm tiết đó. Âm tiết không có cạnh ra là ngõ cụt: ai phải
+# nối vào đó thì thua.
+MAGIC = b'BOTDICT\0'
+VERSION = 3  # 2: âm tiết tách bằng syllables.py thay vì token của pyvi, 3: thêm đồ thị cạnh
+BYTE_ORDER_MARK = 0x01020304
+HEADER = struct.Struct('<8sIIIIIIIQQ')  # magic, version, bom, n, s, e, t, u, source_size, source_mtime_ns
+
+
+def _hash(b):
+    return zlib.crc32(b)
+
+
+def _hash_table(encoded):
+    size = 1
+    while size < 2 * len(encoded):
+        size *= 2
+    mask = size - 1
+    slots = array('I', [0] * size)
+    for i, b in enumerate(encoded):
+        j = _hash(b) & mask
+        while slots[j]:
+            j = (j + 1) & mask
+        slots[j] = i + 1
+    return slots
+
+
+def compile_words(words, first_syllable, last_syllable, source_size=0, source_mtime_ns=0):
+    """Biên dịch danh sách từ thành bytes theo định dạng ở trên."""
+    words = sorted(set(words))
+    encoded = [w.encode('utf-8') for w in words]
+    n = len(words)
+
+    syl_ids = {}
+    word_first = array('I')
+    word_last = array('I')
+    for w in words:
+        word_first.append(syl_ids.setdefault(first_syllable(w), len(syl_ids)))
+        word_last.append(syl_ids.setdefault(last_syllable(w), len(syl_ids)))
+    syllables = [None] * len(syl_ids)
+    for syl, i in syl_ids.items():
+        syllables[i] = syl.encode('utf-8')
+    s = len(syllables)
+
+    word_offsets = array('I', [0])
+    for b in encoded:
+        word_offsets.append(word_offsets[-1] + len(b))
+    syl_offsets = array('I', [0])
+    for b in syllables:
+        syl_offsets.append(syl_offsets[-1] + len(b))
+
+    # xếp từ theo (âm tiết đầu, âm tiết cuối): mỗi âm tiết và mỗi cạnh là một đoạn liền trong by_first
+    by_first = array('I', sorted(range(n), key=lambda i: (word_first[i], word_last[i])))
+    syl_start = array('I', [0] * (s + 1))
+    syl_edges = array('I', [0] * (s + 1))
+    edge_target = array('I')
+    edge_start = array('I')
+    word_edge = array('I', [0] * n)
+    prev = None
+    for k, i in enumerate(by_first):
+        pair = (word_first[i], word_last[i])
+        if pair != prev:
+            edge_start.append(k)
+            edge_target.append(pair[1])
+            prev = pair
+        syl_start[pair[0] + 1] = k + 1
+        syl_edges[pair[0] + 1] = len(edge_target)
+        word_edge[i] = len(edge_target) - 1
+    edge_start.append(n)
+    for i in range(s):
+        # âm tiết không có từ nào bắt đầu bằng nó: khoảng rỗng ngay sau âm tiết trước
+        syl_start[i + 1] = max(syl_start[i + 1], syl_start[i])
+        syl_edges[i + 1] = max(syl_edges[i + 1], syl_edges[i])
+    e = len(edge_target)
+
+    slots = _hash_table(encoded)
+    syl_slots = _hash_table(syllables)
+
+    header = HEADER.pack(MAGIC, VERSION, BYTE_ORDER_MARK, n, s, e, len(slots), len(syl_slots),
+                         source_size, source_mtime_ns)
+    return b''.join([
+        header,
+        word_offsets.tobytes(), word_first.tobytes(), word_last.tobytes(), word_edge.tobytes(),
+        syl_offsets.tobytes(), syl_start.tobytes(), syl_edges.tobytes(),
+        edge_target.tobytes(), edge_start.tobytes(), by_first.tobytes(),
+        slots.tobytes(), syl_slots.tobytes(),
+        b''.join(encoded), b''.join(syllables),
+    ])
+
+
+def read_words(text_path):
+    with open(text_path, 'r', encoding='utf-8') as f:
+        return [line.strip().lower() for line in f if line.strip()]
+
+
+def compile_file(text_path, dict_path, first_syllable, last_syllable):
+    """Biên dịch text_path ra dict_path (ghi file tạm rồi đổi tên), trả về bytes đã ghi."""
+    st = os.stat(text_path)
+    data = compile_words(read_words(text_path), first_syllable, last_syllable, st.st_size, st.st_mtime_ns)
+    tmp = dict_path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, dict_path)
+    return data
+
+
+class WordIndex:
+    """Từ điển chỉ đọc trên vùng nhớ của file đã biên dịch: tra từ O(1) bằng bảng băm,
+    âm tiết đầu/cuối và danh sách từ theo âm tiết đầu đều tính sẵn."""
+
+    def __init__(self, buf, first_syllable=None, last_syllable=None):
+        self._buf = buf
+        self._first_syllable = first_syllable
+        self._last_syllable = last_syllable
+        magic, version, bom, n, s, e, t, u, self.source_size, self.source_mtime_ns = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != VERSION or bom != BYTE_ORDER_MARK:
+            raise ValueError("định dạng từ điển không hợp lệ")
+        mv = self._mv = memoryview(buf)
+        pos = HEADER.size
+
+        def section(count):
+            nonlocal pos
+            view = mv[pos:pos + 4 * count].cast('I')
+            pos += 4 * count
+            return view
+
+        self._n = n
+        self._word_offsets = section(n + 1)
+        self._word_first = section(n)
+        self._word_last = section(n)
+        self._word_edge = section(n)
+        self._syl_offsets = section(s + 1)
+        self._syl_start = section(s + 1)
+        self._syl_edges = section(s + 1)
+        self._edge_target = section(e)
+        self._edge_start = section(e + 1)
+        self._by_first = section(n)
+        self._slots = section(t)
+        self._syl_slots = section(u)
+        self._word_blob = pos
+        self._syl_blob = pos + self._word_offsets[n]
+        self._syl_cache = {}
+
+    @classmethod
+    def build(cls, words, first_syllable, last_syllable):
+        """Dựng trong bộ nhớ, không qua file."""
+        return cls(compile_words(words, first_syllable, last_syllable), first_syllable, last_syllable)
+
+    @classmethod
+    def load(cls, text_path, dict_path, first_syllable, last_syllable):
+        """mmap dict_path; tự biên dịch lại khi chưa có hoặc text_path đã thay đổi."""
+        st = os.stat(text_path)
+        try:
+            with open(dict_path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            index = cls(mm, first_syllable, last_syllable)
+            if index.source_size == st.st_size and index.source_mtime_ns == st.st_mtime_ns:
+                return index
+            index.close()
+        except (OSError, ValueError, struct.error):
+            pass
+        print(f"🔧 Đang biên dịch từ điển {os.path.basename(text_path)} -> {os.path.basename(dict_path)}...")
+        try:
+            compile_file(text_path, dict_path, first_syllable, last_syllable)
+        except OSError as e:
+            print(f"⚠️ Không ghi được {dict_path}: {e}. Dùng bản trong bộ nhớ.")
+            return cls.build(read_words(text_path), first_syllable, last_syllable)
+        with open(dict_path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mm, first_syllable, last_syllable)
+
+    def close(self):
+        for view in (self._word_offsets, self._word_first, self._word_last, self._word_edge,
+                     self._syl_offsets, self._syl_start, self._syl_edges, self._edge_target, self._edge_start,
+                     self._by_first, self._slots, self._syl_slots):
+            view.release()
+        self._mv.release()
+        if isinstance(self._buf, mmap.mmap):
+            self._buf.close()
+
+    # ---- truy cập theo id ----
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError(i)
+        base = self._word_blob
+        return self._buf[base + self._word_offsets[i]:base + self._word_offsets[i + 1]].decode('utf-8')
+
+    def __iter__(self):
+        for i in range(self._n):
+            yield self[i]
+
+    def _syllable(self, sid):
+        syl = self._syl_cache.get(sid)
+        if syl is None:
+            base = self._syl_blob
+            syl = self._buf[base + self._syl_offsets[sid]:base + self._syl_offsets[sid + 1]].decode('utf-8')
+            self._syl_cache[sid] = syl
+        return syl
+
+    def _lookup(self, s, slots, offsets, base):
+        b = s.encode('utf-8')
+        mask = len(slots) - 1
+        j = _hash(b) & mask
+        while True:
+            i = slots[j] - 1
+            if i < 0:
+                return -1
+            start, end = offsets[i], offsets[i + 1]
+            if end - start == len(b) and self._buf[base + start:base + end] == b:
+                return i
+            j = (j + 1) & mask
+
+    def word_id(self, word):
+        """Id của từ, -1 nếu không có."""
+        return self._lookup(word, self._slots, self._word_offsets, self._word_blob)
+
+    # ---- giao diện cho game nối từ ----
+    def __contains__(self, word):
+        return self.word_id(word) >= 0
+
+    def first_syllable(self, word):
+        i = self.word_id(word)
+        if i >= 0:
+            return self._syllable(self._word_first[i])
+        return self._first_syllable(word) if self._first_syllable else None
+
+    def last_syllable(self, word):
+        i = self.word_id(word)
+        if i >= 0:
+            return self._syllable(self._word_last[i])
+        return self._last_syllable(word) if self._last_syllable else None
+
+    def followers(self, syllable):
+        """Các từ bắt đầu bằng `syllable`."""
+        sid = self.syllable_id(syllable)
+        if sid < 0:
+            return ()
+        return tuple(self[i] for i in self.follower_ids(sid))
+
+    # ---- đồ thị âm tiết (theo id) ----
+    def syllable_id(self, syllable):
+        """Id của âm tiết, -1 nếu không có từ nào chứa nó ở đầu hoặc cuối."""
+        return self._lookup(syllable, self._syl_slots, self._syl_offsets, self._syl_blob)
+
+    def syllable(self, sid):
+        return self._syllable(sid)
+
+    def word_edge(self, i):
+        """(âm tiết đầu, âm tiết cuối, cạnh) của từ có id i."""
+        return self._word_first[i], self._word_last[i], self._word_edge[i]
+
+    def follower_ids(self, sid):
+        return self._by_first[self._syl_start[sid]:self._syl_start[sid + 1]]
+
+    def out_degree(self, sid):
+        """Số từ bắt đầu bằng âm tiết sid; 0 là ngõ cụt."""
+        return self._syl_start[sid + 1] - self._syl_start[sid]
+
+    def edges(self, sid):
+        """Các cạnh đi ra từ âm tiết sid (range id cạnh)."""
+        return range(self._syl_edges[sid], self._syl_edges[sid + 1])
+
+    def edge_target(self, k):
+        return self._edge_target[k]
+
+    def edge_size(self, k):
+        return self._edge_start[k + 1] - self._edge_start[k]
+
+    def edge_words(self, k):
+        return self._by_first[self._edge_start[k]:self._edge_start[k + 1]]
+
+
+class UsedWords:
+    """Tập từ đã dùng trong một ván.
+
+    Mỗi nhóm âm tiết đầu giữ danh sách id từ chưa dùng (tạo khi cần lần đầu),
+    xoá bằng cách đổi chỗ với phần tử cuối nên add() và pick() đều O(1).
+    Số từ đã dùng được đếm theo âm tiết đầu và theo cạnh của đồ thị, nên số
+    từ còn lại của một âm tiết hay một cạnh có ngay mà không phải quét.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self._used = set()
+        self._used_ids = set()
+        self._remaining = {}   # id âm tiết đầu -> list id từ chưa dùng
+        self._pos = {}         # id từ -> vị trí trong list của nhóm
+        self._used_from = {}   # id âm tiết đầu -> số từ đã dùng
+        self._used_edges = {}  # id cạnh -> số từ đã dùng
+
+    def __contains__(self, word):
+        return word in self._used
+
+    def __len__(self):
+        return len(self._used)
+
+    def __iter__(self):
+        return iter(self._used)
+
+    def clear(self):
+        self._used.clear()
+        self._used_ids.clear()
+        self._remaining.clear()
+        self._pos.clear()
+        self._used_from.clear()
+        self._used_edges.clear()
+
+    def _bucket(self, sid):
+        bucket = self._remaining.get(sid)
+        if bucket is None:
+            bucket = [i for i in self.index.follower_ids(sid) if i not in self._used_ids]
+            for pos, i in enumerate(bucket):
+                self._pos[i] = pos
+            self._remaining[sid] = bucket
+        return bucket
+
+    def add(self, word):
+        if word in self._used:
+            return
+        self._used.add(word)
+        i = self.index.word_id(word)
+        if i < 0:
+            return
+        self._used_ids.add(i)
+        sid, _, edge = self.index.word_edge(i)
+        self._used_from[sid] = self._used_from.get(sid, 0) + 1
+        self._used_edges[edge] = self._used_edges.get(edge, 0) + 1
+        bucket = self._remaining.get(sid)
+        pos = self._pos.pop(i, None)
+        if bucket is None or pos is None:
+            # nhóm chưa được tạo thì lần tạo sau sẽ tự bỏ qua từ này
+            return
+        tail = bucket.pop()
+        if tail != i:
+            bucket[pos] = tail
+            self._pos[tail] = pos
+
+    def remaining(self, syllable):
+        sid = self.index.syllable_id(syllable)
+        return self.remaining_id(sid) if sid >= 0 else 0
+
+    def remaining_id(self, sid):
+        """Số từ chưa dùng bắt đầu bằng âm tiết sid."""
+        return self.index.out_degree(sid) - self._used_from.get(sid, 0)
+
+    def edge_left(self, k):
+        """Số từ chưa dùng của cạnh k."""
+        return self.index.edge_size(k) - self._used_edges.get(k, 0)
+
+    def pick(self, syllable):
+        """Chọn ngẫu nhiên một từ chưa dùng bắt đầu bằng `syllable`, None nếu hết."""
+        sid = self.index.syllable_id(syllable)
+        bucket = self._bucket(sid) if sid >= 0 else None
+        return self.index[random.choice(bucket)] if bucket else None
+
+    def pick_edge(self, k):
+        """Một từ chưa dùng ngẫu nhiên của cạnh k, None nếu cạnh đã hết từ."""
+        words = [i for i in self.index.edge_words(k) if i not in self._used_ids]
+        return self.index[random.choice(words)] if words else None
+
+
+if __name__ == '__main__':
+    # python dictionary.py [text2.txt] [text2.dict]
+    import sys
+    from syllables import first_syllable, last_syllable
+
+    src = sys.argv[1] if len(sys.argv) > 1 else 'text2.txt'
+    dst = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(src)[0] + '.dict'
+    data = compile_file(src, dst, first_syllable, last_syllable)
+    print(f"✅ {src} -> {dst} ({len(data):,} bytes)")
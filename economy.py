@@ -0,0 +1,393 @@
+import io
+import os
+import csv
+import json
+import time
+import asyncio
+import itertools
+
+from player import Player, ENERGY_MAX
+from bulk import CSV_FIELDS, Progress, run_batched, export_row
+
+
+# -------------------- KINH TẾ --------------------
+# Mọi thao tác đọc/sửa tiền, exp, kho đồ của người chơi đi qua một Economy. Mỗi
+# hàm là một thao tác nguyên tử (giữ lock người chơi, kiểm tra, sửa, mark_dirty)
+# và chỉ nhận/trả dữ liệu thuần (số, chuỗi, dict, list) nên cùng giao diện đó
+# chạy được qua IPC:
+#   Economy        chạy trong process giữ PlayerStore: bot một process, hoặc state
+#                  service (`python bot.py state`) dùng chung cho nhiều shard
+#   RemoteEconomy  client của state service trong từng shard (STATE_SOCKET)
+# Economy còn giữ quyền sở hữu kênh: ván nối từ / vòng tài xỉu của một kênh chỉ
+# chạy ở shard đã claim() được kênh đó, kể cả khi hai process cùng nhận sự kiện
+# của một guild (vd. lúc khởi động lại shard).
+DECAY_SLACK = 300  # lượt trừ hằng đêm tính cả người chơi chỉ còn thiếu chừng này giây là tròn ngày
+
+
+def apply_daily_status(player, day_seconds=86400, now=None):
+    if now is None:
+        now = int(time.time())
+    days_passed = (now - player.last_status_ts) // day_seconds
+    if days_passed >= 1:
+        player.hunger = max(0, player.hunger-days_passed)
+        player.thirst = max(0, player.thirst-days_passed)
+        # chỉ tiến đúng số ngày đã trừ, giữ phần lẻ: đặt bằng `now` sẽ dời mốc theo giờ
+        # lượt trừ hằng đêm chạm tới người chơi, đêm sau có thể chưa đủ một ngày
+        player.last_status_ts += days_passed * day_seconds
+
+
+class Economy:
+    """Thao tác kinh tế trên một PlayerStore, khoá theo LockStripes (locks.py)."""
+
+    def __init__(self, store, locks, leaderboard=None, day_seconds=86400):
+        self.store = store
+        self.locks = locks
+        self.leaderboard = leaderboard
+        self.day_seconds = day_seconds
+        self._owners = {}  # khoá kênh -> (shard, hạn lease theo time.monotonic)
+
+    # ---- người chơi ----
+    def get_player(self, user_id):
+        player = self.store.get(user_id)
+        if player is None:
+            player = Player(last_status_ts=int(time.time()))
+            self.store.add(user_id, player)
+        return player
+
+    def _batch_lock(self, chunk):
+        # lock cho một lô của run_batched: chunk là các user_id hoặc (user_id, ...)
+        return self.locks.acquire(*(item if isinstance(item, str) else item[0] for item in chunk))
+
+    async def view(self, user_id):
+        """Người chơi dạng dict (schema save.txt) sau khi trừ đói/khát, None nếu chưa từng chơi.
+        Chỉ xem nên không tạo người chơi mới."""
+        async with self.locks.acquire(user_id):
+            player = self.store.get(user_id)
+            if player is None:
+                return None
+            apply_daily_status(player, self.day_seconds)
+            return player.to_dict()
+
+    async def buy(self, user_id, item, price):
+        """Trừ `price` và thêm một `item` vào kho. Trả về (thành công, ví sau thao tác)."""
+        async with self.locks.acquire(user_id):
+            player = self.get_player(user_id)
+            apply_daily_status(player, self.day_seconds)
+            if player.pocket < price:
+                return False, player.pocket
+            player.pocket -= price
+            player.add_item(item)
+            self.store.mark_dirty(user_id)
+            return True, player.pocket
+
+    async def eat(self, user_id, item, thirst, hunger):
+        """Dùng một `item` trong kho. Trả về (đói, khát) sau khi ăn, None nếu không có món đó."""
+        async with self.locks.acquire(user_id):
+            player = self.store.get(user_id)
+            if player is not None:
+                apply_daily_status(player, self.day_seconds)
+            if player is None or player.count(item) <= 0:
+                return None
+            player.thirst = min(ENERGY_MAX, player.thirst + thirst)
+            player.hunger = min(ENERGY_MAX, player.hunger + hunger)
+            player.add_item(item, -1)
+            self.store.mark_dirty(user_id)
+            return player.hunger, player.thirst
+
+    async def transfer(self, sender_id, receiver_id, amount):
+        """Chuyển tiền giữa hai người. Trả về (thành công, ví người gửi)."""
+        # giữ lock của cả hai bên, acquire() tự lấy theo thứ tự cố định
+        async with self.locks.acquire(sender_id, receiver_id):
+            sender = self.get_player(sender_id)
+            receiver = self.get_player(receiver_id)
+            apply_daily_status(sender, self.day_seconds)
+            apply_daily_status(receiver, self.day_seconds)
+            if sender.pocket < amount:
+                return False, sender.pocket
+            sender.pocket -= amount
+            receiver.pocket += amount
+            self.store.mark_dirty(sender_id, receiver_id)
+            return True, sender.pocket
+
+    async def bet(self, user_id, amount, max_bet):
+        """Trừ tiền cược. Trả về ('ok' | 'poor' | 'max', ví)."""
+        async with self.locks.acquire(user_id):
+            player = self.get_player(user_id)
+            apply_daily_status(player, self.day_seconds)
+            if amount > player.pocket:
+                return 'poor', player.pocket
+            if amount > max_bet:
+                return 'max', player.pocket
+            player.pocket -= amount
+            self.store.mark_dirty(user_id)
+            return 'ok', player.pocket
+
+    async def credit(self, payouts):
+        """Cộng tiền cho nhiều người ({user_id: cents}) trong một lần giữ lock."""
+        async with self.locks.acquire(*payouts):
+            for user_id, amount in payouts.items():
+                self.get_player(user_id).pocket += amount
+            self.store.mark_dirty(*payouts)
+
+    async def reward_word(self, user_id, coin, level_up_coin, exp_per_level=20):
+        """Thưởng một từ nối đúng: +coin, +1 exp, lên cấp khi đủ exp. Trả về cấp hiện tại."""
+        async with self.locks.acquire(user_id):
+            player = self.get_player(user_id)
+            player.pocket += coin
+            player.exp += 1
+            if player.exp >= player.level * exp_per_level:
+                player.level += 1
+                player.exp = 0
+                player.pocket += level_up_coin
+            self.store.mark_dirty(user_id)
+            return player.level
+
+    async def set_pocket(self, user_id, amount):
+        async with self.locks.acquire(user_id):
+            self._set(user_id, amount)
+
+    def _set(self, user_id, amount):
+        self.get_player(user_id).pocket = amount
+        self.store.mark_dirty(user_id)
+        return True
+
+    # ---- hàng loạt (bulk.py): một lần ghi, nhường event loop giữa các lô ----
+    async def set_many(self, rows, report=None, label="Đặt ví"):
+        """Đặt ví theo [(user_id, cents)], trả về số người đã đặt."""
+        rows = list(rows)
+        progress = Progress(label, len(rows), report) if report else None
+        async with self.store.batch():
+            return await run_batched(rows, lambda row: self._set(*row), lock=self._batch_lock, progress=progress)
+
+    async def add_many(self, user_ids, delta, report=None, label="Cộng ví"):
+        """Cộng `delta` (có thể âm, ví không xuống dưới 0) cho mỗi người, trả về số người."""
+        user_ids = list(user_ids)
+
+        def add(user_id):
+            player = self.get_player(user_id)
+            player.pocket = max(0, player.pocket + delta)
+            self.store.mark_dirty(user_id)
+            return True
+
+        progress = Progress(label, len(user_ids), report) if report else None
+        async with self.store.batch():
+            return await run_batched(user_ids, add, lock=self._batch_lock, progress=progress)
+
+    async def export_csv(self, report=None, label="Xuất CSV"):
+        """Số dư mọi người chơi dạng CSV (CSV_FIELDS). Trả về [số người, nội dung]."""
+        store = self.store
+        total = store.backend.count() if store.backend.lazy else len(store.players)
+        progress = Progress(label, total, report) if report else None
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(CSV_FIELDS)
+        done = 0
+        async for chunk in store.scan():
+            writer.writerows(export_row(uid, p) for uid, p in chunk)
+            done += len(chunk)
+            if progress:
+                await progress.update(done)
+        return [done, buf.getvalue()]
+
+    async def decay(self, report=None, label="Trừ đói/khát"):
+        """Trừ đói/khát cho mọi người chơi trong bộ nhớ, ghi một lần. Trả về [số người đổi, tổng].
+        Người chơi chưa nạp (sqlite) vẫn được trừ lúc nạp vì dựa trên last_status_ts."""
+        players = self.store.players
+        user_ids = list(players)
+        # cùng một mốc cho cả lượt (lượt chạy qua nhiều lô), cộng DECAY_SLACK để lượt
+        # chạy sớm vài giây so với đêm trước vẫn trừ người chơi đó
+        now = int(time.time()) + DECAY_SLACK
+
+        def decay_one(user_id):
+            player = players.get(user_id)
+            if player is None:
+                return False  # đã bị bỏ khỏi cache
+            before = player.last_status_ts
+            apply_daily_status(player, self.day_seconds, now)
+            if player.last_status_ts == before:
+                return False
+            self.store.mark_dirty(user_id)
+            return True
+
+        progress = Progress(label, len(user_ids), report) if report else None
+        async with self.store.batch():
+            changed = await run_batched(user_ids, decay_one, lock=self._batch_lock, progress=progress)
+        return [changed, len(user_ids)]
+
+    # ---- đọc tổng hợp ----
+    async def top(self, board, k):
+        """[(user_id, điểm)] đứng đầu bảng `board` của leaderboard."""
+        return self.leaderboard.top(board, k) if self.leaderboard else []
+
+    async def flush(self, compact=False):
+        return await self.store.flush(compact=compact)
+
+    async def stats(self):
+        store = self.store
+        return {
+            'recovery': store.recovery,
+            'storage': store.describe(),
+            'players': len(store.players),
+            'dirty': len(store.dirty),
+            'channels': len(self._owners),
+        }
+
+    # ---- quyền sở hữu kênh ----
+    async def claim(self, key, owner, ttl):
+        """Giữ `key` (vd. 'wordchain:<channel_id>') cho `owner` trong `ttl` giây.
+        False nếu shard khác đang giữ và lease chưa hết hạn."""
+        now = time.monotonic()
+        current = self._owners.get(key)
+        if current is not None and current[0] != owner and current[1] > now:
+            return False
+        self._owners[key] = (owner, now + ttl)
+        return True
+
+    async def renew(self, keys, owner, ttl):
+        """Gia hạn các key `owner` đang giữ, trả về số key gia hạn được."""
+        now = time.monotonic()
+        renewed = 0
+        for key in keys:
+            current = self._owners.get(key)
+            if current is None or current[0] == owner or current[1] <= now:
+                self._owners[key] = (owner, now + ttl)
+                renewed += 1
+        return renewed
+
+    async def release(self, key, owner):
+        current = self._owners.get(key)
+        if current is not None and current[0] == owner:
+            del self._owners[key]
+
+    def expire_claims(self):
+        now = time.monotonic()
+        for key in [k for k, (_, until) in self._owners.items() if until <= now]:
+            del self._owners[key]
+
+
+# các hàm state service nhận qua IPC
+REMOTE_OPS = ('view', 'buy', 'eat', 'transfer', 'bet', 'credit', 'reward_word', 'set_pocket',
+              'set_many', 'add_many', 'export_csv', 'decay', 'top', 'flush', 'stats',
+              'claim', 'renew', 'release')
+
+
+# -------------------- STATE SERVICE (IPC) --------------------
+# Mỗi dòng là một JSON: yêu cầu {"id", "op", "args", "kwargs"}, trả lời
+# {"id", "result"} hoặc {"id", "error"}. Mỗi yêu cầu chạy thành một task riêng
+# nên một shard gửi được nhiều yêu cầu cùng lúc trên một kết nối; tính nguyên tử
+# do lock người chơi trong Economy đảm bảo vì mọi shard đi qua cùng một process.
+async def serve(economy, path):
+    """Nghe trên unix socket `path` (xoá socket cũ nếu còn)."""
+    if os.path.exists(path):
+        os.unlink(path)
+
+    async def handle(reader, writer):
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        async def answer(request):
+            reply = {'id': request.get('id')}
+            try:
+                op = request['op']
+                if op not in REMOTE_OPS:
+                    raise ValueError(f"unknown op {op!r}")
+                reply['result'] = await getattr(economy, op)(*request.get('args', ()), **request.get('kwargs', {}))
+            except Exception as e:
+                reply['error'] = f"{type(e).__name__}: {e}"
+            data = json.dumps(reply, ensure_ascii=False).encode('utf-8') + b'\n'
+            async with write_lock:
+                writer.write(data)
+                await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(answer(json.loads(line)))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except (ConnectionError, ValueError) as e:
+            print("Error in state service connection:", e)
+        finally:
+            writer.close()
+
+    return await asyncio.start_unix_server(handle, path, limit=64 * 1024 * 1024)
+
+
+class RemoteError(Exception):
+    """State service trả về lỗi cho một yêu cầu."""
+
+
+class RemoteEconomy:
+    """Cùng giao diện với Economy nhưng chuyển từng lời gọi tới state service qua
+    unix socket. Một kết nối cho cả shard, tự nối lại ở lời gọi sau nếu bị đứt;
+    các callback tiến độ (report) không đi qua IPC nên bị bỏ qua."""
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self.calls = 0
+        self._ids = itertools.count(1)
+        self._pending = {}  # id -> Future
+        self._writer = None
+        self._connecting = None
+
+    async def _connect(self):
+        reader, self._writer = await asyncio.open_unix_connection(self.path, limit=64 * 1024 * 1024)
+        asyncio.create_task(self._read(reader, self._writer))
+
+    async def _read(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                reply = json.loads(line)
+                future = self._pending.pop(reply['id'], None)
+                if future is None or future.done():
+                    continue
+                if 'error' in reply:
+                    future.set_exception(RemoteError(reply['error']))
+                else:
+                    future.set_result(reply.get('result'))
+        except (ConnectionError, ValueError) as e:
+            print("Error reading from state service:", e)
+        finally:
+            if self._writer is writer:
+                self._writer = None
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("state service disconnected"))
+            self._pending.clear()
+
+    async def call(self, op, *args, **kwargs):
+        if self._writer is None:
+            if self._connecting is None:
+                self._connecting = asyncio.ensure_future(self._connect())
+            try:
+                await asyncio.shield(self._connecting)
+            finally:
+                if self._connecting is not None and self._connecting.done():
+                    self._connecting = None
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self.calls += 1
+        self._writer.write(json.dumps({'id': request_id, 'op': op, 'args': args, 'kwargs': kwargs},
+                                      ensure_ascii=False).encode('utf-8') + b'\n')
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _remote(op):
+    async def call(self, *args, report=None, **kwargs):
+        return await self.call(op, *args, **kwargs)
+    call.__name__ = op
+    return call
+
+
+for _op in REMOTE_OPS:
+    setattr(RemoteEconomy, _op, _remote(_op))
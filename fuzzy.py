@@ -0,0 +1,93 @@
+import unicodedata
+
+
+# -------------------- GỢI Ý TỪ GẦN ĐÚNG --------------------
+# Chỉ mục symmetric-delete trên dạng không dấu của từ: mỗi từ được ghi dưới khoá
+# của chính nó và các chuỗi có được khi xoá một ký tự. Chuỗi người chơi gõ cũng
+# được bỏ dấu rồi sinh các bản xoá tương tự, nên thiếu dấu / sai dấu không tốn
+# lượt sửa nào và một lỗi gõ (thiếu, thừa, sai, đảo ký tự) vẫn khớp được, chỉ
+# cần vài lần tra dict thay vì so với cả từ điển.
+MAX_SUGGESTIONS = 3
+
+_STRIP = {ord('đ'): 'd', ord('Đ'): 'D'}
+
+
+def strip_accents(text):
+    """'Đường phố' -> 'Duong pho'."""
+    text = unicodedata.normalize('NFD', text.translate(_STRIP))
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def _deletes(key):
+    return {key[:i] + key[i + 1:] for i in range(len(key))}
+
+
+def edit_distance(a, b):
+    """Khoảng cách Damerau-Levenshtein (đảo hai ký tự liền nhau tính một lần sửa)."""
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class FuzzyIndex:
+    """Tra từ gần đúng trên một WordIndex, trả về id/từ có trong từ điển."""
+
+    def __init__(self, index):
+        self.index = index
+        table = {}
+        for i, word in enumerate(index):
+            key = strip_accents(word)
+            table.setdefault(key, []).append(i)
+            for d in _deletes(key):
+                table.setdefault(d, []).append(i)
+        # bảng chỉ đọc sau khi dựng: khoá chỉ có một từ (đa số) giữ int thay vì tuple
+        self._table = {k: v[0] if len(v) == 1 else tuple(v) for k, v in table.items()}
+
+    def __len__(self):
+        return len(self._table)
+
+    def candidates(self, text):
+        """Id các từ cách `text` (đã bỏ dấu) không quá một lần sửa."""
+        key = strip_accents(text)
+        keys = _deletes(key)
+        keys.add(key)
+        found = set()
+        get = self._table.get
+        for k in keys:
+            ids = get(k)
+            if ids is None:
+                continue
+            if type(ids) is int:
+                found.add(ids)
+            else:
+                found.update(ids)
+        return found
+
+    def suggest(self, text, first_syllable=None, exclude=(), limit=MAX_SUGGESTIONS):
+        """Tối đa `limit` từ gần `text` nhất, chỉ lấy từ bắt đầu bằng `first_syllable` (nếu có)
+        và không nằm trong `exclude`. Xếp theo số lần sửa khi bỏ dấu rồi khi giữ dấu."""
+        index = self.index
+        key = strip_accents(text)
+        sid = -1
+        if first_syllable is not None:
+            sid = index.syllable_id(first_syllable)
+            if sid < 0:
+                return []
+        ranked = []
+        for i in self.candidates(text):
+            if sid >= 0 and index.word_edge(i)[0] != sid:
+                continue
+            word = index[i]
+            if word == text or word in exclude:
+                continue
+            ranked.append((edit_distance(key, strip_accents(word)), edit_distance(text, word), word))
+        ranked.sort()
+        return [word for _, _, word in ranked[:limit]]
@@ -0,0 +1,140 @@
+import heapq
+from bisect import bisect_left, insort
+
+
+# -------------------- BẢNG XẾP HẠNG --------------------
+# Ranking giữ các cặp (điểm, id) đã sắp xếp; mỗi lần điểm một người đổi chỉ là
+# một bisect để gỡ và một insort để chèn lại, xem top K là cắt K phần tử cuối.
+# Leaderboard giữ một Ranking cho mỗi loại xếp hạng (tiền, cấp) trên toàn bộ
+# người chơi, được PlayerStore báo mỗi khi người chơi bị mark_dirty, tức là ngay
+# sau mọi chỗ đổi tiền / exp (buy, give, tài xỉu, nối từ...).
+class Ranking:
+    """Xếp hạng theo điểm, cập nhật từng người.
+
+    Không có `capacity` thì giữ mọi người (dùng cho bảng điểm một ván). Có
+    `capacity` thì chỉ giữ chừng đó người cao nhất cùng ngưỡng `floor`: người
+    ngoài bảng có điểm <= floor, người trong bảng có điểm >= floor. Người trong
+    bảng tụt xuống dưới floor bị bỏ ra; khi bảng còn ít hơn số người cần xem,
+    top() trả về None và phải reset() lại từ dữ liệu đầy đủ.
+    """
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity
+        self._keys = []    # (điểm, id) tăng dần
+        self._scores = {}  # id -> điểm
+        self.floor = None  # None: không ai nằm ngoài bảng
+        self.ready = capacity is None
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __bool__(self):
+        return bool(self._keys)
+
+    def get(self, key, default=0):
+        return self._scores.get(key, default)
+
+    def clear(self):
+        self._keys.clear()
+        self._scores.clear()
+        self.floor = None
+        self.ready = self.capacity is None
+
+    def reset(self, entries, floor=None):
+        """Dựng lại từ (id, điểm); `floor` là điểm cao nhất có thể của người không có trong entries."""
+        self._scores = {key: score for key, score in entries if floor is None or score >= floor}
+        self._keys = sorted((score, key) for key, score in self._scores.items())
+        self.floor = floor
+        self.ready = True
+        self._trim()
+
+    def _trim(self):
+        if self.capacity is None:
+            return
+        while len(self._keys) > self.capacity:
+            score, key = self._keys.pop(0)
+            del self._scores[key]
+            self.floor = score
+
+    def update(self, key, score):
+        if not self.ready:
+            return  # lần reset() sau sẽ đọc điểm mới
+        old = self._scores.get(key)
+        if old == score:
+            return
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (old, key))]
+            del self._scores[key]
+        if self.floor is None or score >= self.floor:
+            insort(self._keys, (score, key))
+            self._scores[key] = score
+            self._trim()
+
+    def add(self, key, delta=1):
+        self.update(key, self._scores.get(key, 0) + delta)
+
+    def top(self, k):
+        """[(id, điểm)] của k người cao nhất, None nếu bảng không còn đủ chắc chắn."""
+        if not self.ready or (self.floor is not None and len(self._keys) < k):
+            return None
+        return [(key, score) for score, key in reversed(self._keys[-k:])] if k > 0 else []
+
+    def items(self):
+        return self.top(len(self._keys))
+
+
+class Leaderboard:
+    """Top người chơi trên toàn bộ store theo từng cách tính điểm trong `scores` (tên -> hàm(player)).
+
+    Mỗi bảng chỉ giữ `capacity` người đứng đầu. Bảng được dựng lần đầu khi có
+    người xem, và dựng lại khi đã có quá nhiều người tụt khỏi bảng: với backend
+    nạp hết (JSON) là một lượt duyệt players, với backend lazy (SQLite) là một
+    truy vấn theo chỉ mục cộng với người chơi đang nằm trong cache.
+    """
+
+    def __init__(self, store, scores, capacity=100):
+        self.store = store
+        self.scores = scores
+        self.capacity = capacity
+        self.boards = {name: Ranking(capacity) for name in scores}
+        self.rebuilds = 0
+
+    def update(self, user_id, player):
+        for name, score in self.scores.items():
+            self.boards[name].update(user_id, score(player))
+
+    def top(self, name, k=10):
+        k = min(k, self.capacity)
+        rows = self.boards[name].top(k)
+        if rows is None:
+            self._rebuild(name)
+            rows = self.boards[name].top(k)
+        return rows
+
+    def _rebuild(self, name):
+        score = self.scores[name]
+        store = self.store
+        floor = None
+        if store.backend.lazy:
+            decode = store.record.from_dict if store.record is not None else None
+            limit = self.capacity
+            while True:
+                entries = {}
+                rows = store.backend.top(name, limit)
+                for user_id, data in rows:
+                    entries[user_id] = score(decode(data) if decode else data)
+                floor = min(entries.values()) if len(rows) >= limit else None
+                # bản trong bộ nhớ có thể mới hơn bản đã ghi
+                for user_id, player in store.players.items():
+                    entries[user_id] = score(player)
+                if floor is None or sum(s >= floor for s in entries.values()) >= self.capacity:
+                    break
+                limit *= 2  # bản trong cache kéo nhiều người xuống dưới floor, lấy thêm
+            entries = entries.items()
+        else:
+            entries = ((user_id, score(player)) for user_id, player in store.players.items())
+            if len(store.players) > self.capacity:
+                entries = heapq.nlargest(self.capacity, entries, key=lambda e: e[1])
+                floor = entries[-1][1]
+        self.boards[name].reset(entries, floor)
+        self.rebuilds += 1
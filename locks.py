@@ -0,0 +1,41 @@
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
+
+# -------------------- LOCK THEO NGƯỜI CHƠI --------------------
+class LockStripes:
+    """Một dãy cố định `size` lock, mỗi người chơi rơi vào một lock theo hash id.
+
+    Lệnh của những người chơi khác lock chạy song song, số lock không tăng theo
+    số người chơi. acquire(*ids) lấy các lock theo thứ tự chỉ số tăng dần nên
+    các thao tác hai bên (give, trả thưởng cả vòng) không thể deadlock nhau.
+    Nếu có `wait` (Histogram trong metrics.py), tổng thời gian chờ lấy đủ lock
+    được ghi vào đó.
+    """
+
+    def __init__(self, size=64, wait=None):
+        self._locks = [asyncio.Lock() for _ in range(size)]
+        self.wait = wait
+
+    def index(self, key):
+        return hash(key) % len(self._locks)
+
+    def lock(self, key):
+        return self._locks[self.index(key)]
+
+    @asynccontextmanager
+    async def acquire(self, *keys):
+        ordered = sorted({self.index(k) for k in keys})
+        held = []
+        t0 = time.perf_counter()
+        try:
+            for i in ordered:
+                await self._locks[i].acquire()
+                held.append(self._locks[i])
+            if self.wait is not None:
+                self.wait.observe(time.perf_counter() - t0)
+            yield
+        finally:
+            for lock in reversed(held):
+                lock.release()
@@ -0,0 +1,151 @@
+import time
+import asyncio
+from bisect import bisect_left
+
+
+# -------------------- SỐ ĐO --------------------
+# Histogram với bucket cố định: observe() chỉ là một bisect và vài phép cộng,
+# không cấp phát gì, nên có thể gọi trên mọi đường nóng. Metrics gom các
+# histogram theo tên + nhãn, xuất ra dạng text của Prometheus và tóm tắt p50/p99.
+SECONDS_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+                   0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864, 268435456)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'count', 'sum', 'max')
+
+    def __init__(self, buckets=SECONDS_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # phần tử cuối: lớn hơn bucket lớn nhất
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p):
+        """Cận trên của bucket chứa phân vị p (ước lượng, đủ để thấy bậc độ lớn)."""
+        if not self.count:
+            return 0.0
+        rank = p * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if c and seen >= rank:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+
+class TimedLock:
+    """`async with TimedLock(lock, hist):` như `async with lock:` nhưng ghi thời gian chờ lock vào hist."""
+    __slots__ = ('lock', 'hist')
+
+    def __init__(self, lock, hist):
+        self.lock = lock
+        self.hist = hist
+
+    async def __aenter__(self):
+        t0 = time.perf_counter()
+        await self.lock.acquire()
+        self.hist.observe(time.perf_counter() - t0)
+
+    async def __aexit__(self, *exc):
+        self.lock.release()
+
+
+def _labels(key):
+    return '{' + ','.join(f'{k}="{v}"' for k, v in key) + '}' if key else ''
+
+
+class Metrics:
+    def __init__(self, prefix='bot'):
+        self.prefix = prefix
+        self._families = {}  # tên -> (mô tả, buckets, {nhãn: Histogram})
+        self._gauges = []    # (tên, mô tả, hàm trả về giá trị lúc đọc)
+
+    def histogram(self, name, help, buckets=SECONDS_BUCKETS, **labels):
+        """Histogram theo tên + nhãn, tạo mới ở lần gọi đầu tiên."""
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = (help, buckets, {})
+        key = tuple(sorted(labels.items()))
+        hist = family[2].get(key)
+        if hist is None:
+            hist = family[2][key] = Histogram(family[1])
+        return hist
+
+    def gauge(self, name, help, fn):
+        self._gauges.append((name, help, fn))
+
+    def families(self):
+        """[(tên, mô tả, [(nhãn, Histogram)])] theo thứ tự tạo."""
+        return [(name, help, list(series.items())) for name, (help, _, series) in self._families.items()]
+
+    def render(self):
+        """Toàn bộ số đo theo định dạng text 0.0.4 của Prometheus."""
+        out = []
+        for name, help, series in self.families():
+            full = f"{self.prefix}_{name}"
+            out.append(f"# HELP {full} {help}")
+            out.append(f"# TYPE {full} histogram")
+            for key, hist in series:
+                cumulative = 0
+                for bound, c in zip(hist.buckets, hist.counts):
+                    cumulative += c
+                    out.append(f"{full}_bucket{_labels(key + (('le', repr(float(bound))),))} {cumulative}")
+                out.append(f"{full}_bucket{_labels(key + (('le', '+Inf'),))} {hist.count}")
+                out.append(f"{full}_sum{_labels(key)} {hist.sum!r}")
+                out.append(f"{full}_count{_labels(key)} {hist.count}")
+        for name, help, fn in self._gauges:
+            full = f"{self.prefix}_{name}"
+            out.append(f"# HELP {full} {help}")
+            out.append(f"# TYPE {full} gauge")
+            try:
+                out.append(f"{full} {fn()}")
+            except Exception as e:
+                print(f"Error reading gauge {name}:", e)
+        return '\n'.join(out) + '\n'
+
+
+# -------------------- ĐỘ TRỄ EVENT LOOP --------------------
+async def watch_loop_lag(hist, interval=0.5):
+    """Ngủ `interval` giây rồi ghi lại phần thức dậy muộn: đó là thời gian một
+    handler nào đó giữ event loop mà không nhường."""
+    loop = asyncio.get_running_loop()
+    while True:
+        t0 = loop.time()
+        await asyncio.sleep(interval)
+        hist.observe(max(0.0, loop.time() - t0 - interval))
+
+
+# -------------------- HTTP /metrics --------------------
+async def serve(metrics, host='127.0.0.1', port=9108):
+    """Endpoint HTTP tối giản cho Prometheus: GET /metrics trả về metrics.render()."""
+
+    async def handle(reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readline(), 5)
+            while (await asyncio.wait_for(reader.readline(), 5)) not in (b'\r\n', b'\n', b''):
+                pass  # bỏ qua header
+            parts = request.split()
+            if len(parts) >= 2 and parts[0] == b'GET' and parts[1].split(b'?')[0] in (b'/', b'/metrics'):
+                status, body = '200 OK', metrics.render().encode('utf-8')
+            else:
+                status, body = '404 Not Found', b'not found\n'
+            writer.write((f"HTTP/1.1 {status}\r\n"
+                          "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                          f"Content-Length: {len(body)}\r\n"
+                          "Connection: close\r\n\r\n").encode('ascii') + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
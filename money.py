@@ -0,0 +1,57 @@
+from decimal import Decimal, DecimalException, InvalidOperation, ROUND_DOWN, localcontext
+
+
+# -------------------- TIỀN (SỐ NGUYÊN, ĐƠN VỊ XU LẺ) --------------------
+# Trong bot mọi số tiền là int tính bằng 1/100 xu (cents). Chuỗi người dùng gõ
+# chỉ được đổi sang int ở ranh giới lệnh (parse_money), và chỉ được in ra qua
+# fmt_money, nên các phép cộng trừ trên đường nóng không tạo Decimal nào.
+CENTS = 100
+INF_POCKET = 999999999999999999999999 * CENTS  # giá trị admin đặt bằng `!bank set @user inf`
+MAX_EXPONENT = 30  # số người dùng gõ lớn hơn 10^30 bị từ chối (vẫn trên INF_POCKET)
+
+
+def _to_cents(d):
+    with localcontext() as ctx:
+        ctx.prec = 200  # đủ cho số như 1E+48 mà không làm tròn
+        return int((d * CENTS).to_integral_value(rounding=ROUND_DOWN))
+
+
+def parse_money(text):
+    """'12.345' -> 1234 (bỏ phần lẻ dưới 0.01). Ném ValueError nếu không phải số hữu hạn
+    hoặc quá lớn (số mũ kiểu '9e999990' làm phép nhân chạy rất lâu)."""
+    try:
+        d = Decimal(str(text).strip())
+        if not d.is_finite() or d.adjusted() > MAX_EXPONENT:
+            raise ValueError(text)
+        return _to_cents(d)
+    except DecimalException:
+        raise ValueError(text)
+
+
+def from_stored(value):
+    """Đổi pocket đã lưu sang cents. Chấp nhận int (định dạng mới) và chuỗi Decimal
+    kiểu cũ như "0", "12.50", "0E+21", "1.0E+48", "inf"."""
+    if type(value) is int:
+        return value
+    try:
+        d = Decimal(str(value).strip())
+    except InvalidOperation:
+        return 0
+    if d.is_nan():
+        return 0
+    if d.is_infinite():
+        return INF_POCKET if d > 0 else 0
+    return _to_cents(d)
+
+
+def fmt_money(cents):
+    """Giống hệt fmt_decimal cũ: 1234567 -> '12,345.67'."""
+    sign = '-' if cents < 0 else ''
+    whole, frac = divmod(abs(cents), CENTS)
+    return f"{sign}{whole:,}.{frac:02d}"
+
+
+
+def fmt_plain(cents):
+    """Như fmt_money nhưng không có dấu phẩy ngăn cách: 1234567 -> '12345.67' (CSV, parse_money đọc lại được)."""
+    return fmt_money(cents).replace(',', '')
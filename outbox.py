@@ -0,0 +1,100 @@
+import time
+import asyncio
+from collections import deque
+
+
+# -------------------- HÀNG ĐỢI GỬI TIN THEO KÊNH --------------------
+class TokenBucket:
+    """Cho phép `rate` lần gửi mỗi `per` giây, giống bucket giới hạn theo kênh của Discord."""
+
+    def __init__(self, rate, per):
+        self.rate = rate
+        self.per = per
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / self.per)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) * self.per / self.rate)
+
+
+class Outbox:
+    """Handler gọi send(channel, text) rồi trả về ngay; mỗi kênh có hàng đợi và
+    một task gửi riêng, chỉ tồn tại khi còn tin chờ hoặc bucket chưa hồi đủ.
+    Task chờ `window` giây để gom các tin sinh ra gần nhau thành một tin (tối đa
+    `limit` ký tự) và tự giới hạn `rate` tin mỗi `per` giây cho mỗi kênh. Lỗi
+    429 từ Discord vẫn do discord.py tự thử lại."""
+
+    def __init__(self, window=0.25, limit=2000, rate=5, per=5.0):
+        self.window = window
+        self.limit = limit
+        self.rate = rate
+        self.per = per
+        self._queues = {}   # channel.id -> deque[(text, thời điểm xếp hàng)]
+        self._tasks = {}    # channel.id -> task gửi, giữ bucket giới hạn của kênh
+        self.sent = 0       # số lần gọi API gửi tin
+        self.queued = 0     # số tin handler đã xếp hàng
+        self.latencies = deque(maxlen=1000)  # giây từ lúc xếp hàng tới lúc gửi xong
+
+    def send(self, channel, text):
+        q = self._queues.get(channel.id)
+        if q is None:
+            q = self._queues[channel.id] = deque()
+        q.append((text, time.monotonic()))
+        self.queued += 1
+        if channel.id not in self._tasks:
+            self._tasks[channel.id] = asyncio.create_task(self._drain(channel, q))
+
+    def depth(self):
+        return sum(len(q) for q in self._queues.values())
+
+    def latency_percentile(self, p):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+    def _take_batch(self, q):
+        parts, times, size = [], [], 0
+        while q:
+            text, t = q[0]
+            extra = len(text) + (1 if parts else 0)
+            if parts and size + extra > self.limit:
+                break
+            q.popleft()
+            parts.append(text)
+            times.append(t)
+            size += extra
+        return '\n'.join(parts), times
+
+    async def _drain(self, channel, q):
+        bucket = TokenBucket(self.rate, self.per)
+        try:
+            while True:
+                if not q:
+                    # giữ task (và bucket) tới khi bucket đầy lại để tin tới sau vẫn bị giới hạn đúng
+                    refill = (bucket.rate - bucket.tokens) * bucket.per / bucket.rate - (time.monotonic() - bucket.updated)
+                    if refill <= 0:
+                        return
+                    await asyncio.sleep(min(refill, self.window))
+                    continue
+                await asyncio.sleep(self.window)
+                await bucket.acquire()
+                text, times = self._take_batch(q)
+                try:
+                    await channel.send(text)
+                except Exception as e:
+                    print(f"Error sending to channel {channel.id}:", e)
+                self.sent += 1
+                now = time.monotonic()
+                self.latencies.extend(now - t for t in times)
+        finally:
+            del self._tasks[channel.id]
+            if not q:
+                del self._queues[channel.id]
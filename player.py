@@ -0,0 +1,93 @@
+import time
+from array import array
+
+from money import from_stored
+
+
+# -------------------- NGƯỜI CHƠI --------------------
+# Mỗi người chơi là một Player có __slots__ thay vì dict 8 khoá + dict inventory
+# lồng bên trong. Kho đồ là mảng số lượng theo id món (vị trí trong ITEMS). Trên
+# đĩa (save.txt, players.db) vẫn là đúng schema dict cũ, đổi qua lại bằng
+# from_dict / to_dict.
+ENERGY_MAX = 5
+
+# id món = vị trí trong tuple, tên phải trùng với shop_items trong bot.py.
+# Id chỉ dùng trong bộ nhớ nên thêm/bớt món không ảnh hưởng dữ liệu đã lưu.
+ITEMS = ("nước", "bánh mì", "pizza", "hamburger")
+ITEM_ID = {name: i for i, name in enumerate(ITEMS)}
+
+
+class Player:
+    __slots__ = ('pocket', 'exp', 'level', 'combo', 'hunger', 'thirst', 'last_status_ts', 'counts', 'other_items')
+
+    def __init__(self, pocket=0, exp=0, level=1, combo=0, hunger=ENERGY_MAX, thirst=ENERGY_MAX, last_status_ts=0):
+        self.pocket = pocket  # cents (money.py)
+        self.exp = exp
+        self.level = level
+        self.combo = combo
+        self.hunger = hunger
+        self.thirst = thirst
+        self.last_status_ts = last_status_ts
+        self.counts = None       # array số lượng theo id món, chỉ tạo khi có món đầu tiên
+        self.other_items = None  # món không còn trong ITEMS, giữ nguyên để không mất khi lưu lại
+
+    @classmethod
+    def from_dict(cls, data):
+        """Từ dict theo schema save.txt; pocket kiểu chuỗi Decimal cũ được đổi sang cents."""
+        get = data.get
+        pocket = get('pocket', 0)
+        if type(pocket) is not int:
+            pocket = from_stored(pocket)
+        last_ts = get('last_status_ts')
+        player = cls(pocket, get('exp', 0), get('level', 1), get('combo', 0), get('hunger', ENERGY_MAX),
+                     get('thirst', ENERGY_MAX), int(time.time()) if last_ts is None else last_ts)
+        inventory = get('inventory')
+        if inventory:
+            for name, qty in inventory.items():
+                player.add_item(name, qty)
+        return player
+
+    def to_dict(self):
+        return {
+            "pocket": self.pocket,
+            "exp": self.exp,
+            "level": self.level,
+            "combo": self.combo,
+            "inventory": dict(self.items()),
+            "hunger": self.hunger,
+            "thirst": self.thirst,
+            "last_status_ts": self.last_status_ts,
+        }
+
+    def count(self, name):
+        item_id = ITEM_ID.get(name)
+        if item_id is not None:
+            return self.counts[item_id] if self.counts else 0
+        return self.other_items.get(name, 0) if self.other_items else 0
+
+    def add_item(self, name, qty=1):
+        """Thêm (qty > 0) hoặc bớt (qty < 0) món trong kho, số lượng không âm."""
+        item_id = ITEM_ID.get(name)
+        if item_id is not None:
+            if self.counts is None:
+                if qty <= 0:
+                    return
+                self.counts = array('I', bytes(4 * len(ITEMS)))
+            self.counts[item_id] = max(0, self.counts[item_id] + qty)
+            return
+        other = self.other_items or {}
+        left = other.get(name, 0) + qty
+        if left > 0:
+            other[name] = left
+        else:
+            other.pop(name, None)
+        self.other_items = other or None
+
+    def items(self):
+        """(tên món, số lượng) của các món đang có, theo thứ tự ITEMS."""
+        if self.counts:
+            for item_id, qty in enumerate(self.counts):
+                if qty:
+                    yield ITEMS[item_id], qty
+        if self.other_items:
+            yield from self.other_items.items()
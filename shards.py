@@ -0,0 +1,196 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import signal
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+from bench import FakeUser, FakeChannel, FakeContext, RESULT_MARK, START_POCKET, make_save, player_id, summarize, timed
+
+
+# -------------------- HARNESS NHIỀU SHARD --------------------
+# Chạy một state service (`python bot.py state`) và nhiều process shard nạp
+# bot.py với STATE_SOCKET, không kết nối Discord. Các shard cùng lúc:
+#   - chuyển tiền qua lại trong một nhóm người chơi dùng chung (tranh lock ở state service)
+#   - mua đồ bằng tiền của cùng nhóm đó
+#   - mở ván nối từ ở cùng các kênh, mỗi kênh chỉ được một shard giữ
+# rồi kiểm tra tổng tiền + tiền đã mua đồ không đổi và mỗi kênh đúng một chủ.
+#
+#   python shards.py                     4 shard, 200 người chơi dùng chung
+#   python shards.py --shards 8 --ops 2000
+#
+# Thoát với mã 1 nếu một trong các kiểm tra sai.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BUY_ITEM = 'nước'
+STARTUP_TIMEOUT = 60
+
+
+class RecordingChannel(FakeChannel):
+    """FakeChannel giữ lại nội dung đã gửi để đếm lệnh thành công."""
+
+    def __init__(self, channel_id):
+        super().__init__(channel_id)
+        self.messages = []
+
+    async def send(self, content=None, **kwargs):
+        await super().send(content, **kwargs)
+        self.messages.append(content or '')
+
+
+# -------------------- SHARD --------------------
+async def run_shard(app, args):
+    rng = random.Random(args.worker)
+    group = [FakeUser(player_id(i)) for i in range(args.players)]
+    # chờ mọi shard nạp xong bot.py rồi bắt đầu cùng lúc
+    await asyncio.sleep(max(0.0, args.start_at - time.time()))
+
+    # tranh quyền các kênh nối từ dùng chung
+    games = {}
+    for channel_id in range(1, args.channels + 1):
+        channel = games[channel_id] = RecordingChannel(channel_id)
+        await app.start.callback(FakeContext(channel, group[0]))
+    owned = [cid for cid, ch in games.items() if any(m.startswith('🎮') for m in ch.messages)]
+
+    channel = RecordingChannel(10000 + args.worker)
+    gives, buys = [], []
+    tasks = []
+    for _ in range(args.ops):
+        a, b = rng.sample(group, 2)
+        tasks.append(timed(gives, app.give.callback(FakeContext(channel, a), b, str(rng.randint(1, 50)))))
+        if rng.random() < 0.1:
+            tasks.append(timed(buys, app.buy.callback(FakeContext(channel, a), item_name=BUY_ITEM)))
+    t0 = time.perf_counter()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - t0
+    bought = sum(m.startswith('✅') and 'đã mua' in m for m in channel.messages)
+    return {
+        'give': summarize(gives, elapsed),
+        'buy': summarize(buys),
+        'info': {
+            'owned': owned,
+            'bought': bought,
+            'spent': bought * app.shop_items[BUY_ITEM]['price'],
+            'calls': app.economy.calls,
+        },
+    }
+
+
+def run_worker(args):
+    """Chạy trong process con: nạp bot.py như một shard rồi chạy tải."""
+    sys.path.insert(0, BASE_DIR)
+    import bot as app
+    app.bot._connection.user = FakeUser(1, 'shard-bot')
+    result = asyncio.run(run_shard(app, args))
+    print(RESULT_MARK + json.dumps(result))
+
+
+# -------------------- ĐIỀU PHỐI --------------------
+async def pockets(path, count):
+    from economy import RemoteEconomy
+    economy = RemoteEconomy(path)
+    try:
+        views = await asyncio.gather(*(economy.view(str(player_id(i))) for i in range(count)))
+        stats = await economy.stats()
+    finally:
+        economy.close()
+    return sum(v['pocket'] for v in views if v), stats
+
+
+def wait_for_socket(proc, path):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while not os.path.exists(path):
+        if proc.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError(f"State service không khởi động được:\n{proc.stdout.read()}")
+        time.sleep(0.05)
+
+
+def main(args):
+    workdir = tempfile.mkdtemp(prefix='bot-shards-')
+    save_path = os.path.join(workdir, 'save.txt')
+    socket_path = os.path.join(workdir, 'state.sock')
+    make_save(save_path, args.players)
+    env = dict(os.environ, SAVE_FILE=save_path, STATE_SOCKET=socket_path, STORAGE_BACKEND='json',
+               BOT_TOKEN='', BACKUP_REMOTE='', GITHUB_USER='', GITHUB_TOKEN='', METRICS_PORT='0',
+               PYTHONDONTWRITEBYTECODE='1')
+    state = subprocess.Popen([sys.executable, os.path.join(BASE_DIR, 'bot.py'), 'state'], env=env, cwd=workdir,
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    failures = []
+    try:
+        wait_for_socket(state, socket_path)
+        before = START_POCKET * args.players
+        start_at = time.time() + args.warmup
+        shards = []
+        for i in range(args.shards):
+            cmd = [sys.executable, os.path.abspath(__file__), '--worker', str(i), '--players', str(args.players),
+                   '--ops', str(args.ops), '--channels', str(args.channels), '--start-at', str(start_at)]
+            shards.append(subprocess.Popen(cmd, env=dict(env, SHARD_COUNT=str(args.shards), SHARD_IDS=str(i)),
+                                           cwd=workdir, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True))
+        results = []
+        for i, proc in enumerate(shards):
+            out, err = proc.communicate()
+            line = next((l for l in out.splitlines() if l.startswith(RESULT_MARK)), None)
+            if line is None:
+                raise RuntimeError(f"Shard {i} lỗi:\n{out}\n{err}")
+            results.append(json.loads(line[len(RESULT_MARK):]))
+        after, stats = asyncio.run(pockets(socket_path, args.players))
+    finally:
+        state.send_signal(signal.SIGTERM)
+        try:
+            log = state.communicate(timeout=STARTUP_TIMEOUT)[0]
+        except subprocess.TimeoutExpired:
+            state.kill()
+            log = state.communicate()[0]
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'shard':<8}{'give':>8}{'p50 ms':>11}{'p99 ms':>11}{'lệnh/s':>10}{'mua':>7}{'kênh':>7}{'IPC':>9}")
+    for i, r in enumerate(results):
+        give, info = r['give'], r['info']
+        print(f"{i:<8}{give['n']:>8}{give['p50_ms']:>11.3f}{give['p99_ms']:>11.3f}{give['ops_s']:>10,.0f}"
+              f"{info['bought']:>7}{len(info['owned']):>7}{info['calls']:>9,}")
+    print(f"tổng: {sum(r['give']['ops_s'] for r in results):,.0f} lệnh give/s trên {args.shards} shard")
+
+    spent = sum(r['info']['spent'] for r in results)
+    if after != before - spent:
+        failures.append(f"tổng tiền {before} - {spent} đã mua != {after}")
+    owners = {}
+    for i, r in enumerate(results):
+        for channel_id in r['info']['owned']:
+            owners.setdefault(channel_id, []).append(i)
+    for channel_id in range(1, args.channels + 1):
+        if len(owners.get(channel_id, [])) != 1:
+            failures.append(f"kênh {channel_id} có chủ {owners.get(channel_id, [])}")
+    if stats['channels'] != args.channels:
+        failures.append(f"state service giữ {stats['channels']} kênh, cần {args.channels}")
+    if state.returncode != 0:
+        failures.append(f"state service thoát với mã {state.returncode}:\n{log}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print(f"✅ Tổng tiền khớp ({after:,} cents), mỗi kênh trong {args.channels} kênh đúng một shard giữ.")
+    return 1 if failures else 0
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Chạy nhiều shard bot.py với một state service, không kết nối Discord")
+    parser.add_argument('--shards', type=int, default=4)
+    parser.add_argument('--players', type=int, default=200, help="số người chơi dùng chung giữa các shard")
+    parser.add_argument('--ops', type=int, default=1000, help="số lượt give mỗi shard")
+    parser.add_argument('--channels', type=int, default=20, help="số kênh nối từ các shard cùng tranh")
+    parser.add_argument('--warmup', type=float, default=3.0, help="giây chờ các shard nạp bot.py trước khi chạy")
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--start-at', type=float, default=0.0, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args(sys.argv[1:])
+    if args.worker is not None:
+        run_worker(args)
+    else:
+        sys.exit(main(args))
@@ -0,0 +1,560 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import asyncio
+import copy
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+
+# -------------------- LƯU DỮ LIỆU --------------------
+# PlayerStore giữ người chơi đang dùng trong bộ nhớ, đánh dấu người chơi đã
+# thay đổi và gom lại ghi xuống backend theo chu kỳ. Backend là nơi lưu thật:
+#   JsonBackend   save.txt (snapshot) + save.txt.journal, nạp hết vào RAM
+#   SqliteBackend một file SQLite (WAL), chỉ nạp người chơi khi cần
+# Mỗi backend có:
+#   lazy                         True nếu không nạp hết người chơi lúc khởi động
+#   load_all(decode) -> dict     người chơi nạp sẵn lúc khởi động, decode(dict) nếu có
+#   load(user_id) -> dict|None   nạp một người chơi (backend lazy)
+#   top(order, limit) -> [(id, dict)]  người chơi đứng đầu theo 'pocket'/'level' (backend lazy)
+#   page(after, limit) -> [(id, dict)]  người chơi có id > after theo thứ tự id (backend lazy)
+#   needs_snapshot(compact) -> bool  lần ghi này có cần chụp toàn bộ người chơi không
+#   prepare(items, snapshot, compact) -> payload   chạy trên event loop; items (và snapshot
+#                                nếu có) là (id, dict) riêng của lần ghi nên có thể mã hoá ở thread
+#   write(payload) -> int        chạy ở thread, mã hoá và ghi payload xuống đĩa, trả về số byte đã ghi
+#   describe() -> str            mô tả ngắn cho !stats
+#   close()
+def write_atomic(path, data):
+    """Ghi ra file tạm cạnh path rồi os.replace, không bao giờ để lại file ghi dở.
+    data là chuỗi hoặc các mảnh chuỗi ghi nối nhau."""
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        if isinstance(data, str):
+            f.write(data)
+        else:
+            f.writelines(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load_snapshot(path, decode=None):
+    """Đọc save.txt. Có decode thì mỗi người chơi (object có khoá 'pocket') được đổi
+    ngay trong lúc parse, không giữ cùng lúc cả triệu dict tạm trong bộ nhớ."""
+    if not os.path.exists(path):
+        return {}
+    hook = None
+    if decode is not None:
+        hook = lambda obj: decode(obj) if 'pocket' in obj else obj
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            return json.load(f, object_hook=hook)
+        except ValueError:
+            return {}
+
+
+def replay_journal(players, journal_path, decode=None):
+    """Áp các bản ghi journal lên players, dừng ở dòng hỏng đầu tiên (ghi dở khi crash)
+    và cắt bỏ phần hỏng để các lần ghi sau nối tiếp vào dòng lành. Dòng cuối thiếu
+    '\n' cũng tính là ghi dở dù parse được, nếu không lần ghi sau sẽ nối vào cùng dòng."""
+    count = 0
+    if not os.path.exists(journal_path):
+        return count
+    good = 0
+    with open(journal_path, 'rb') as f:
+        for line in f:
+            try:
+                if not line.endswith(b'\n'):
+                    raise ValueError("dòng cuối chưa ghi xong")
+                rec = json.loads(line)
+                players[rec['id']] = decode(rec['p']) if decode is not None else rec['p']
+            except (ValueError, KeyError, TypeError):
+                print(f"⚠️ Journal hỏng sau {count} bản ghi, bỏ qua phần còn lại.")
+                break
+            count += 1
+            good += len(line)
+    if good < os.path.getsize(journal_path):
+        os.truncate(journal_path, good)
+    return count
+
+
+def _encode_snapshot(items):
+    """(id, dict) -> các mảnh của một object JSON, mỗi mảnh SNAPSHOT_BATCH người chơi."""
+    yield '{'
+    for i in range(0, len(items), SNAPSHOT_BATCH):
+        part = json.dumps(dict(items[i:i + SNAPSHOT_BATCH]), ensure_ascii=False)[1:-1]
+        yield (',' if i else '') + part
+    yield '}'
+
+
+# -------------------- JSON (save.txt + journal) --------------------
+class JsonBackend:
+    """save.txt là ảnh chụp toàn bộ người chơi, save.txt.journal là nhật ký chỉ ghi nối:
+    mỗi dòng là trạng thái mới của một người chơi vừa thay đổi
+        {"id": "<user_id>", "p": {...}}
+    Ghi lại cả bản ghi người chơi (vài trăm byte) thay vì delta để phát lại
+    nhiều lần vẫn ra cùng kết quả. Khi journal vượt `compact_bytes` hoặc đã
+    `compact_interval` giây kể từ lần gộp trước, snapshot được ghi lại và
+    journal được làm rỗng.
+    """
+    lazy = False
+
+    def __init__(self, path, compact_bytes=4 * 1024 * 1024, compact_interval=600):
+        self.path = path
+        self.journal_path = path + '.journal'
+        self.compact_bytes = compact_bytes
+        self.compact_interval = compact_interval
+        self.saves = 0          # số lần đã ghi journal
+        self.compactions = 0    # số lần đã ghi lại snapshot
+        self.journal_bytes = 0
+        self.snapshot_players = 0
+        self.journal_records = 0
+        self._last_compact = time.monotonic()
+
+    def load_all(self, decode=None):
+        players = load_snapshot(self.path, decode)
+        self.snapshot_players = len(players)
+        self.journal_records = replay_journal(players, self.journal_path, decode)
+        self.journal_bytes = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+        return players
+
+    def load(self, user_id):
+        return None
+
+    def _should_compact(self):
+        return self.journal_bytes >= self.compact_bytes or (
+            self.journal_bytes and time.monotonic() - self._last_compact >= self.compact_interval)
+
+    def needs_snapshot(self, compact=False):
+        return compact or self._should_compact()
+
+    def prepare(self, items, snapshot, compact=False):
+        if not items and snapshot is None:
+            return None
+        return items, snapshot
+
+    def write(self, payload):
+        items, snapshot = payload
+        if snapshot is not None:
+            # không indent để json dùng bộ mã hoá C; mã hoá theo lô vì một lần dumps
+            # giữ GIL suốt thời gian chạy và chặn luôn event loop
+            snapshot = _encode_snapshot(snapshot)
+        records = ''.join(
+            json.dumps({'id': uid, 'p': p}, ensure_ascii=False) + '\n' for uid, p in items)
+        written = 0
+        if records:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(records)
+                f.flush()
+                os.fsync(f.fileno())
+            written = len(records.encode('utf-8'))
+            self.journal_bytes += written
+            self.saves += 1
+        if snapshot is not None:
+            # snapshot đã gồm mọi bản ghi trong journal, nên crash giữa hai bước vẫn phát lại đúng
+            write_atomic(self.path, snapshot)
+            open(self.journal_path, 'w').close()
+            written += os.path.getsize(self.path)
+            self.journal_bytes = 0
+            self.compactions += 1
+            self._last_compact = time.monotonic()
+        return written
+
+    def describe(self):
+        return (f"JSON: journal {self.journal_bytes:,} bytes, "
+                f"{self.saves} lần ghi, {self.compactions} lần gộp")
+
+    def close(self):
+        pass
+
+
+# -------------------- SQLITE --------------------
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    id     TEXT PRIMARY KEY,
+    data   TEXT NOT NULL,     -- người chơi dạng JSON, cùng schema với save.txt
+    pocket REAL NOT NULL,     -- chỉ dùng để sắp xếp/lọc, giá trị thật nằm trong data
+    level  INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_players_pocket ON players(pocket);
+CREATE INDEX IF NOT EXISTS idx_players_level ON players(level);
+"""
+
+UPSERT = ("INSERT INTO players (id, data, pocket, level) VALUES (?, ?, ?, ?) "
+          "ON CONFLICT(id) DO UPDATE SET data=excluded.data, pocket=excluded.pocket, level=excluded.level")
+
+
+TOP_ORDER = {
+    'pocket': "pocket DESC",
+    'level': "level DESC, json_extract(data, '$.exp') DESC",
+}
+
+
+def _pocket_key(player):
+    # pocket là int cents (money.py); bản ghi cũ chưa chuyển đổi còn là chuỗi Decimal tính bằng xu
+    pocket = player.get('pocket', 0)
+    try:
+        return pocket / 100 if type(pocket) is int else float(pocket)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class SqliteBackend:
+    """Mỗi người chơi một dòng, chế độ WAL. Event loop đọc qua một kết nối riêng,
+    các lô ghi chạy trong thread qua kết nối thứ hai, mỗi lô là một transaction."""
+    lazy = True
+
+    def __init__(self, path):
+        self.path = path
+        self.saves = 0
+        self.rows_written = 0
+        self._writer = self._connect(check_same_thread=False)
+        self._writer.executescript(SCHEMA)
+        self._reader = self._connect()
+
+    def _connect(self, **kwargs):
+        conn = sqlite3.connect(self.path, isolation_level=None, **kwargs)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def load_all(self, decode=None):
+        return {}
+
+    def load(self, user_id):
+        row = self._reader.execute("SELECT data FROM players WHERE id=?", (user_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def count(self):
+        return self._reader.execute("SELECT COUNT(*) FROM players").fetchone()[0]
+
+    def page(self, after, limit):
+        rows = self._reader.execute("SELECT id, data FROM players WHERE id > ? ORDER BY id LIMIT ?",
+                                    (after, limit)).fetchall()
+        return [(uid, json.loads(data)) for uid, data in rows]
+
+    def top(self, order, limit):
+        """(id, dict) của `limit` người chơi đứng đầu theo 'pocket' hoặc 'level' (rồi exp), đi theo chỉ mục."""
+        by = TOP_ORDER[order]
+        rows = self._reader.execute(f"SELECT id, data FROM players ORDER BY {by} LIMIT ?", (limit,)).fetchall()
+        return [(uid, json.loads(data)) for uid, data in rows]
+
+    def needs_snapshot(self, compact=False):
+        return False
+
+    def prepare(self, items, snapshot, compact=False):
+        if not items and not compact:
+            return None
+        return items, compact
+
+    def write(self, payload):
+        items, compact = payload
+        rows = [(uid, json.dumps(p, ensure_ascii=False), _pocket_key(p), int(p.get('level', 1)))
+                for uid, p in items]
+        written = 0
+        if rows:
+            self._writer.execute("BEGIN")
+            try:
+                self._writer.executemany(UPSERT, rows)
+                self._writer.execute("COMMIT")
+            except Exception:
+                self._writer.execute("ROLLBACK")
+                raise
+            self.saves += 1
+            self.rows_written += len(rows)
+            written = sum(len(row[1]) for row in rows)  # kích thước JSON, không tính chỉ mục
+        if compact:
+            self._writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return written
+
+    def describe(self):
+        return f"SQLite: {self.saves} lô ghi, {self.rows_written:,} dòng"
+
+    def close(self):
+        self._reader.close()
+        self._writer.close()
+
+
+# -------------------- PLAYER STORE --------------------
+SNAPSHOT_BATCH = 2000  # số người chơi chụp lại mỗi lượt event loop khi flush
+
+
+class PlayerStore:
+    """Đánh dấu người chơi đã thay đổi và gom lại ghi một lần.
+
+    mark_dirty() chỉ ghi nhận id rồi trả về ngay; vòng run() ghi người chơi bẩn
+    xuống backend sau mỗi `interval` giây, hoặc sớm hơn khi số người chơi bẩn
+    đạt `max_dirty`. Gọi flush() để ghi ngay, flush_sync() khi tắt bot.
+    Sau mỗi lần ghi, on_flush(giây, số người chơi, số byte) được gọi nếu có;
+    on_dirty(id, người chơi) được gọi ngay trong mark_dirty (vd. cập nhật bảng xếp hạng).
+    Nếu có `record` (vd. Player), người chơi trong bộ nhớ là record.from_dict(dict
+    đã lưu) và được ghi lại bằng to_dict(); backend chỉ thấy dict.
+
+    Với backend lazy, players là cache LRU: giữ tối đa `cache_size` người chơi,
+    người chơi không được dùng trong `ttl` giây bị bỏ khỏi bộ nhớ và nạp lại khi
+    cần. Người chơi còn chờ ghi (hoặc đang ghi) không bao giờ bị bỏ; khi cache
+    đầy vì họ, store ghi sớm rồi mới bỏ. Backend JSON ghi lại save.txt từ bộ nhớ
+    nên luôn giữ đủ mọi người chơi.
+
+    Thao tác hàng loạt chạy trong `async with store.batch():` để mọi thay đổi
+    được ghi một lần khi ra khỏi khối thay vì từng đợt max_dirty.
+    """
+
+    def __init__(self, backend, interval=5.0, max_dirty=200, on_flush=None, cache_size=50000, ttl=3600,
+                 record=None, on_dirty=None):
+        self.backend = backend
+        self.record = record
+        self.on_flush = on_flush
+        self.on_dirty = on_dirty
+        self.interval = interval
+        self.max_dirty = max_dirty
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self.dirty = set()
+        self.evictions = 0
+        self._evict_scheduled = False
+        self._batches = 0      # số khối batch() đang chạy
+        self._writing = set()  # id đang được ghi ở thread, chưa được bỏ khỏi cache
+        self._touched = {}     # id -> lần dùng gần nhất (time.monotonic), chỉ với backend lazy
+        t0 = time.perf_counter()
+        self.players = backend.load_all(record.from_dict if record is not None else None)
+        if backend.lazy:
+            self.players = OrderedDict(self.players)  # cũ nhất ở đầu
+        self.recovery = {   # thống kê lần khôi phục lúc khởi động
+            'snapshot_players': getattr(backend, 'snapshot_players', 0),
+            'journal_records': getattr(backend, 'journal_records', 0),
+            'seconds': time.perf_counter() - t0,
+        }
+        self._wake = asyncio.Event()
+        self._write_lock = asyncio.Lock()
+
+    def get(self, user_id):
+        """Người chơi trong bộ nhớ hoặc nạp từ backend, None nếu chưa có."""
+        player = self.players.get(user_id)
+        if not self.backend.lazy:
+            return player
+        if player is None:
+            player = self.backend.load(user_id)
+            if player is None:
+                return None
+            if self.record is not None:
+                player = self.record.from_dict(player)
+            self.add(user_id, player)
+        else:
+            self.players.move_to_end(user_id)
+            self._touched[user_id] = time.monotonic()
+        return player
+
+    def add(self, user_id, player):
+        """Đưa người chơi (mới hoặc vừa nạp) vào bộ nhớ."""
+        self.players[user_id] = player
+        if self.backend.lazy:
+            self.players.move_to_end(user_id)
+            self._touched[user_id] = time.monotonic()
+            if len(self.players) > self.cache_size and not self._evict_scheduled:
+                # không bỏ ngay: lệnh vừa lấy người chơi còn đang sửa và sẽ mark_dirty
+                # trước khi nhường event loop, nên chỉ bỏ ở lượt sau của loop
+                self._evict_scheduled = True
+                try:
+                    asyncio.get_running_loop().call_soon(self.evict)
+                except RuntimeError:
+                    self.evict()
+
+    def evict(self):
+        """Bỏ người chơi cũ nhất khi cache vượt cache_size, và người chơi quá ttl
+        giây không dùng. Trả về số người chơi đã bỏ."""
+        self._evict_scheduled = False
+        if not self.backend.lazy:
+            return 0
+        over = len(self.players) - self.cache_size
+        cutoff = time.monotonic() - self.ttl
+        victims = []
+        pending = False
+        for user_id in self.players:
+            if over <= 0 and self._touched.get(user_id, 0) >= cutoff:
+                break
+            if user_id in self.dirty or user_id in self._writing:
+                pending = True  # ghi xong mới được bỏ
+                continue
+            victims.append(user_id)
+            over -= 1
+        for user_id in victims:
+            del self.players[user_id]
+            self._touched.pop(user_id, None)
+        self.evictions += len(victims)
+        if pending and over > 0:
+            self._wake.set()
+        return len(victims)
+
+    def mark_dirty(self, *user_ids):
+        self.dirty.update(user_ids)
+        if self.on_dirty:
+            for user_id in user_ids:
+                player = self.players.get(user_id)
+                if player is not None:
+                    self.on_dirty(user_id, player)
+        if len(self.dirty) >= self.max_dirty and not self._batches:
+            self._wake.set()
+
+    @asynccontextmanager
+    async def batch(self):
+        """Trong khối này vòng run() không ghi; ra khỏi khối thì flush() một lần."""
+        self._batches += 1
+        try:
+            yield
+        finally:
+            self._batches -= 1
+        if not self._batches:
+            await self.flush()
+
+    async def scan(self, batch=500):
+        """Duyệt mọi người chơi theo từng lô [(id, người chơi)], nhường event loop giữa các lô.
+
+        Với backend lazy, người chơi chưa nạp được đọc thẳng từ backend (không đưa
+        vào cache); bản trong bộ nhớ luôn được ưu tiên vì có thể mới hơn.
+        """
+        if not self.backend.lazy:
+            ids = list(self.players)
+            for i in range(0, len(ids), batch):
+                chunk = [(uid, self.players[uid]) for uid in ids[i:i + batch] if uid in self.players]
+                if chunk:
+                    yield chunk
+                await asyncio.sleep(0)
+            return
+        await self.flush()  # để người chơi mới tạo cũng có trong backend
+        decode = self.record.from_dict if self.record is not None else None
+        after = ''
+        while True:
+            rows = self.backend.page(after, batch)
+            if not rows:
+                return
+            after = rows[-1][0]
+            chunk = []
+            for uid, data in rows:
+                player = self.players.get(uid)
+                if player is None:
+                    player = decode(data) if decode else data
+                chunk.append((uid, player))
+            yield chunk
+            await asyncio.sleep(0)
+
+    def _snapshot(self, ids):
+        # bản dict riêng của lần ghi, thread ghi đĩa mã hoá mà không đụng tới người chơi đang dùng
+        items = [(uid, self.players[uid]) for uid in ids if uid in self.players]
+        if self.record is not None:
+            return [(uid, p.to_dict()) for uid, p in items]
+        return [(uid, copy.deepcopy(p)) for uid, p in items]
+
+    async def _snapshot_batched(self, ids):
+        items = []
+        for i in range(0, len(ids), SNAPSHOT_BATCH):
+            if i:
+                await asyncio.sleep(0)
+            items.extend(self._snapshot(ids[i:i + SNAPSHOT_BATCH]))
+        return items
+
+    def _prepare(self, compact):
+        items = self._snapshot(self.dirty)
+        self.dirty.clear()
+        snapshot = self._snapshot(self.players) if self.backend.needs_snapshot(compact) else None
+        return self.backend.prepare(items, snapshot, compact)
+
+    async def flush(self, compact=False):
+        """Ghi ngay nếu có thay đổi, trả về số người chơi đã được ghi.
+
+        Người chơi được chụp lại trên event loop theo lô SNAPSHOT_BATCH và nhường
+        loop giữa các lô, nên một lần ghi rất lớn (thao tác hàng loạt, gộp journal
+        vào save.txt) không chặn các lệnh khác; người chơi đổi sau khi đã được
+        chụp sẽ bẩn lại và được ghi ở lần sau.
+        """
+        async with self._write_lock:
+            count = len(self.dirty)
+            ids = list(self.dirty)
+            self.dirty.clear()
+            self._writing = set(ids)
+            t0 = time.perf_counter()
+            written = None
+            try:
+                items = await self._snapshot_batched(ids)
+                snapshot = None
+                if self.backend.needs_snapshot(compact):
+                    snapshot = await self._snapshot_batched(list(self.players))
+                payload = self.backend.prepare(items, snapshot, compact)
+                if payload is None:
+                    return 0
+                future = asyncio.get_running_loop().run_in_executor(None, self.backend.write, payload)
+                try:
+                    written = await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    # huỷ không dừng được thread đang ghi: chờ nó xong rồi mới nhả
+                    # _write_lock, nếu không lần ghi sau sẽ ghi chồng lên cùng file
+                    while not future.done():
+                        try:
+                            await asyncio.shield(future)
+                        except asyncio.CancelledError:
+                            pass
+                    written = future.result()
+                    raise
+            except BaseException:
+                # ghi lỗi hoặc bị huỷ trước khi ghi (lúc tắt) thì lần sau / flush_sync ghi lại
+                if written is None:
+                    self.dirty.update(ids)
+                raise
+            finally:
+                self._writing = set()
+            if self.on_flush:
+                self.on_flush(time.perf_counter() - t0, count, written)
+            return count
+
+    def flush_sync(self):
+        payload = self._prepare(True)
+        if payload is not None:
+            self.backend.write(payload)
+
+    def describe(self):
+        text = self.backend.describe()
+        if self.backend.lazy:
+            text += (f"; cache {len(self.players):,}/{self.cache_size:,} người chơi, "
+                     f"đã bỏ {self.evictions:,}")
+        return text
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._batches:
+                continue  # batch() tự ghi khi xong
+            try:
+                await self.flush()
+            except Exception as e:
+                print("Error in save loop:", e)
+            self.evict()
+
+
+def migrate_json_to_sqlite(save_path, db_path, batch=10000):
+    """Chép toàn bộ save.txt (+ journal) sang SQLite theo từng lô, trả về số người chơi."""
+    players = JsonBackend(save_path).load_all()
+    db = SqliteBackend(db_path)
+    items = list(players.items())
+    for i in range(0, len(items), batch):
+        db.write(db.prepare(items[i:i + batch], None))
+    db.write(db.prepare([], None, compact=True))
+    db.close()
+    return len(items)
+
+
+if __name__ == '__main__':
+    # python storage.py migrate [save.txt] [players.db]
+    if len(sys.argv) < 2 or sys.argv[1] != 'migrate':
+        print("Cách dùng: python storage.py migrate [save.txt] [players.db]")
+        sys.exit(1)
+    src = sys.argv[2] if len(sys.argv) > 2 else 'save.txt'
+    dst = sys.argv[3] if len(sys.argv) > 3 else 'players.db'
+    t0 = time.perf_counter()
+    n = migrate_json_to_sqlite(src, dst)
+    print(f"✅ Đã chuyển {n} người chơi từ {src} sang {dst} trong {time.perf_counter() - t0:.2f}s")
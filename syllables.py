@@ -0,0 +1,42 @@
+import re
+from functools import lru_cache
+
+
+# -------------------- TÁCH ÂM TIẾT --------------------
+# Từ trong text2.txt đã là các âm tiết cách nhau bởi dấu cách nên chỉ cần split().
+# pyvi (nạp mô hình CRF, mất ~1.4s) chỉ được import khi gặp chuỗi tự do có dấu câu
+# hoặc ký tự lạ; khi đó các từ ghép pyvi nối bằng '_' được tách lại thành âm tiết.
+CACHE_SIZE = 4096
+
+_PLAIN = re.compile(r'[^\W\d_]+(?: [^\W\d_]+)*')  # chỉ gồm chữ và dấu cách đơn
+_tokenizer = None
+
+
+def _vi_tokenize(text):
+    global _tokenizer
+    if _tokenizer is None:
+        from pyvi import ViTokenizer
+        _tokenizer = ViTokenizer
+    return _tokenizer.tokenize(text)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def split_text(text):
+    """Âm tiết của chuỗi người chơi gõ, bỏ dấu câu."""
+    text = ' '.join(text.split())
+    if _PLAIN.fullmatch(text):
+        return tuple(text.split())
+    syllables = []
+    for token in _vi_tokenize(text).split():
+        syllables.extend(s for s in token.split('_') if _PLAIN.fullmatch(s))
+    return tuple(syllables)
+
+
+def first_syllable(text):
+    syllables = split_text(text)
+    return syllables[0] if syllables else None
+
+
+def last_syllable(text):
+    syllables = split_text(text)
+    return syllables[-1] if syllables else None
@@ -0,0 +1,147 @@
+import time
+import heapq
+import asyncio
+
+
+# -------------------- TÀI XỈU: BẢNG TRẢ THƯỞNG --------------------
+MESSAGE_LIMIT = 2000  # giới hạn độ dài một tin nhắn Discord
+
+VALID_CHOICES = ['tài', 'xỉu', 'tai', 'xiu', 'chẵn', 'lẻ'] + [str(i) for i in range(3, 19)]
+
+
+def _build_payouts():
+    """PAYOUTS[tổng][lựa chọn] = số lần tiền cược được trả lại khi thắng (gồm cả tiền gốc).
+    Lựa chọn không có trong bảng của một tổng là thua."""
+    table = {}
+    for total in range(3, 19):
+        row = {}
+        if 11 <= total <= 17:
+            row['tài'] = row['tai'] = 2
+        if 4 <= total <= 10:
+            row['xỉu'] = row['xiu'] = 2
+        row['chẵn' if total % 2 == 0 else 'lẻ'] = 2
+        row[str(total)] = 11
+        table[total] = row
+    return table
+
+
+PAYOUTS = _build_payouts()
+
+
+def settle(bets, total, fmt):
+    """Tính kết quả cả vòng một lượt.
+
+    bets: user_id -> {'choice','amount','name'}. Trả về (payouts, lines) với
+    payouts: user_id -> số tiền cộng lại vào ví (chỉ người thắng), lines: từng
+    dòng kết quả, fmt dùng để in số tiền.
+    """
+    row = PAYOUTS[total]
+    payouts = {}
+    lines = []
+    for user_id, bet in bets.items():
+        amount = bet['amount']
+        factor = row.get(bet['choice'])
+        if factor:
+            win_amount = amount * factor
+            payouts[user_id] = win_amount
+            lines.append(f"✅ {bet['name']} thắng! +{fmt(win_amount)} xu")
+        else:
+            lines.append(f"❌ {bet['name']} thua! -{fmt(amount)} xu")
+    return payouts, lines
+
+
+def chunk_lines(lines, limit=MESSAGE_LIMIT):
+    """Ghép các dòng thành các tin nhắn không vượt quá limit ký tự."""
+    chunks = []
+    current = ''
+    for line in lines:
+        if len(line) + 1 > limit:
+            line = line[:limit - 2] + '…'
+        if current and len(current) + len(line) + 1 > limit:
+            chunks.append(current)
+            current = ''
+        current += line + '\n'
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# -------------------- TÀI XỈU: LỊCH CÁC VÒNG --------------------
+class Round:
+    """Một vòng cược đang mở trong một kênh."""
+    __slots__ = ('channel', 'channel_id', 'deadline', 'bets', 'lock', 'closed')
+
+    def __init__(self, channel, deadline=None):
+        self.channel = channel
+        self.channel_id = channel.id
+        self.deadline = deadline  # None: chưa có cược nào được nhận, chưa chạy giờ
+        self.bets = {}  # user_id -> {'choice','amount','name'}
+        self.lock = asyncio.Lock()
+        self.closed = False
+
+
+class RoundScheduler:
+    """Giữ mọi vòng đang mở trong một heap theo hạn chót; một task duy nhất ngủ
+    tới hạn gần nhất, đóng vòng rồi gọi on_expire(round). Vòng đã đóng bị gỡ
+    hẳn khỏi bộ nhớ nên số kênh từng cược không làm tăng trạng thái giữ lại."""
+
+    def __init__(self, duration, on_expire):
+        self.duration = duration
+        self.on_expire = on_expire
+        self.rounds = {}   # channel_id -> Round đang mở
+        self._heap = []    # (deadline, channel_id)
+        self._wake = asyncio.Event()
+        self._closing = set()  # giữ tham chiếu tới các task đang trả thưởng
+        self.settled = 0
+
+    def open_rounds(self):
+        return len(self.rounds)
+
+    def get_or_open(self, channel):
+        """Vòng đang mở của kênh, mở vòng mới nếu chưa có. Trả về (round, mới_mở).
+        Vòng mới chưa chạy giờ cho tới khi start()."""
+        rnd = self.rounds.get(channel.id)
+        if rnd is not None:
+            return rnd, False
+        rnd = self.rounds[channel.id] = Round(channel)
+        return rnd, True
+
+    def start(self, rnd):
+        """Bắt đầu đếm `duration` giây cho vòng, gọi khi vòng nhận cược đầu tiên."""
+        rnd.deadline = time.monotonic() + self.duration
+        heapq.heappush(self._heap, (rnd.deadline, rnd.channel_id))
+        if self._heap[0][1] == rnd.channel_id:
+            self._wake.set()  # hạn mới sớm hơn hạn task đang chờ
+
+    def discard(self, rnd):
+        """Bỏ vòng chưa chạy giờ (mọi lệnh cược đều bị từ chối); gọi khi đang giữ rnd.lock."""
+        rnd.closed = True
+        if self.rounds.get(rnd.channel_id) is rnd:
+            del self.rounds[rnd.channel_id]
+
+    async def _close(self, rnd):
+        # chờ lệnh cược đang dở trong kênh xong rồi mới đóng
+        async with rnd.lock:
+            rnd.closed = True
+        self.settled += 1
+        try:
+            await self.on_expire(rnd)
+        except Exception as e:
+            print("Error in tài xỉu round:", e)
+
+    async def run(self):
+        while True:
+            timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+            if timeout is None or timeout > 0:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            _, channel_id = heapq.heappop(self._heap)
+            rnd = self.rounds.pop(channel_id, None)
+            if rnd is not None:
+                task = asyncio.create_task(self._close(rnd))
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
@@ -0,0 +1,210 @@
+import asyncio
+import random
+import time
+
+from dictionary import UsedWords
+from leaderboard import Ranking
+
+
+# -------------------- PHIÊN NỐI TỪ THEO KÊNH --------------------
+class WordChainSession:
+    """Trạng thái một ván nối từ trong một kênh, có lock riêng."""
+
+    def __init__(self, channel_id, index, active_channels):
+        self.channel_id = channel_id
+        self.lock = asyncio.Lock()
+        self._active_channels = active_channels
+        self._active = False
+        self.last_word = None
+        self.used_words = UsedWords(index)
+        self.player_scores = Ranking()  # tên người chơi -> điểm trong ván, luôn xếp sẵn
+        self.bot_turn = False
+        self.difficulty = DEFAULT_LEVEL
+        self.last_activity = time.monotonic()
+
+    @property
+    def active(self):
+        return self._active
+
+    @active.setter
+    def active(self, value):
+        # giữ active_channels của registry khớp với trạng thái ván
+        self._active = value
+        if value:
+            self._active_channels.add(self.channel_id)
+        else:
+            self._active_channels.discard(self.channel_id)
+
+    def touch(self):
+        self.last_activity = time.monotonic()
+
+
+class SessionRegistry:
+    """channel_id -> WordChainSession. Phiên không hoạt động quá idle_seconds sẽ bị dọn.
+
+    active_channels là tập kênh đang có ván, đọc trực tiếp không cần lock để
+    on_message bỏ qua ngay tin nhắn ở kênh không chơi.
+    """
+
+    def __init__(self, index, idle_seconds):
+        self.index = index
+        self.idle_seconds = idle_seconds
+        self.sessions = {}
+        self.active_channels = set()
+        self.fast_path = 0  # số tin nhắn bỏ qua ngay vì kênh không có ván
+        self.slow_path = 0  # số tin nhắn phải xử lý như một lượt nối từ
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def get(self, channel_id):
+        return self.sessions.get(channel_id)
+
+    def get_or_create(self, channel_id):
+        session = self.sessions.get(channel_id)
+        if session is None:
+            session = self.sessions[channel_id] = WordChainSession(channel_id, self.index, self.active_channels)
+        return session
+
+    def expire_idle(self, now=None):
+        """Gỡ các phiên quá hạn (bỏ qua phiên đang giữ lock), trả về danh sách phiên đã gỡ."""
+        now = time.monotonic() if now is None else now
+        expired = [s for s in self.sessions.values()
+                   if now - s.last_activity >= self.idle_seconds and not s.lock.locked()]
+        for s in expired:
+            del self.sessions[s.channel_id]
+            self.active_channels.discard(s.channel_id)
+        return expired
+
+    async def run_expiry(self, interval, on_expire=None):
+        """Vòng nền: mỗi `interval` giây dọn phiên quá hạn, gọi on_expire(session) cho phiên còn đang chơi."""
+        while True:
+            await asyncio.sleep(interval)
+            for session in self.expire_idle():
+                if session.active and on_expire:
+                    try:
+                        await on_expire(session)
+                    except Exception as e:
+                        print("Error in word chain expiry:", e)
+
+
+# -------------------- BOT NỐI TỪ --------------------
+# Bot chọn từ trên đồ thị âm tiết của WordIndex: mỗi nước là một cạnh (âm tiết
+# đầu -> âm tiết cuối), đối thủ phải đi tiếp từ âm tiết cuối. UsedWords cho biết
+# ngay số từ còn lại của mỗi âm tiết / cạnh nên không phải quét từ điển.
+#   easy   - ngẫu nhiên như trước
+#   normal - chọn nước để đối thủ còn ít lựa chọn nhất
+#   hard   - negamax alpha-beta, đào sâu dần tới MAX_DEPTH trong thời gian cho phép
+LEVELS = ('easy', 'normal', 'hard')
+LEVEL_ALIASES = {'dễ': 'easy', 'thường': 'normal', 'khó': 'hard'}
+LEVEL_NAMES = {'easy': 'dễ', 'normal': 'thường', 'hard': 'khó'}
+DEFAULT_LEVEL = 'easy'
+MAX_DEPTH = 6
+WIN = 1 << 20  # điểm của thế thắng chắc, lớn hơn mọi số từ còn lại
+
+
+def parse_level(text):
+    """Tên độ khó (tiếng Anh hoặc dễ/thường/khó) -> khoá trong LEVELS, None nếu không hợp lệ."""
+    if text is None:
+        return DEFAULT_LEVEL
+    text = text.strip().lower()
+    level = LEVEL_ALIASES.get(text, text)
+    return level if level in LEVELS else None
+
+
+class _Timeout(Exception):
+    pass
+
+
+class _Search:
+    """Tìm kiếm trên đồ thị với số từ đã dùng giả định cộng dồn lên UsedWords (không sửa UsedWords)."""
+
+    def __init__(self, used, deadline):
+        self.used = used
+        self.index = used.index
+        self.deadline = deadline
+        self.taken_from = {}
+        self.taken_edges = {}
+        self.nodes = 0
+
+    def remaining(self, sid):
+        return self.used.remaining_id(sid) - self.taken_from.get(sid, 0)
+
+    def moves(self, sid):
+        """Các cạnh còn từ đi ra từ sid, cạnh dẫn tới âm tiết ít lựa chọn nhất đứng trước."""
+        index = self.index
+        moves = [k for k in index.edges(sid)
+                 if self.used.edge_left(k) - self.taken_edges.get(k, 0) > 0]
+        moves.sort(key=lambda k: self.remaining(index.edge_target(k)))
+        return moves
+
+    def play(self, sid, k, step):
+        self.taken_from[sid] = self.taken_from.get(sid, 0) + step
+        self.taken_edges[k] = self.taken_edges.get(k, 0) + step
+
+    def negamax(self, sid, depth, alpha, beta):
+        """Điểm của người phải đi từ âm tiết sid: hết nước là thua, tới lá thì là số lựa chọn còn lại."""
+        if depth == 0:
+            return self.remaining(sid)
+        self.nodes += 1
+        if not self.nodes & 15 and time.perf_counter() > self.deadline:
+            raise _Timeout
+        moves = self.moves(sid)
+        if not moves:
+            return -WIN
+        best = -WIN
+        for k in moves:
+            self.play(sid, k, 1)
+            try:
+                score = -self.negamax(self.index.edge_target(k), depth - 1, -beta, -alpha)
+            finally:
+                self.play(sid, k, -1)
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best
+
+
+def choose_word(used, syllable, level=DEFAULT_LEVEL, budget=0.02):
+    """Từ bot đi tiếp sau `syllable` theo độ khó, None nếu hết từ.
+
+    Chạy đồng bộ: normal chỉ xét một bước, hard dừng khi hết `budget` giây và
+    dùng kết quả của độ sâu cuối cùng đã xét xong.
+    """
+    if level == 'easy':
+        return used.pick(syllable)
+    index = used.index
+    sid = index.syllable_id(syllable)
+    if sid < 0:
+        return None
+    search = _Search(used, time.perf_counter() + budget)
+    moves = search.moves(sid)
+    if not moves:
+        return None
+
+    def ranked(depth):
+        scores = []
+        for k in moves:
+            search.play(sid, k, 1)
+            try:
+                scores.append(-search.negamax(index.edge_target(k), depth, -WIN - 1, WIN + 1))
+            finally:
+                search.play(sid, k, -1)
+        return scores
+
+    scores = ranked(0)
+    if level == 'hard':
+        for depth in range(1, MAX_DEPTH):
+            try:
+                deeper = ranked(depth)
+            except _Timeout:
+                break
+            scores = deeper
+            if abs(max(scores)) >= WIN:
+                break  # thắng chắc, hoặc nước nào cũng thua
+    best = max(scores)
+    k = random.choice([k for k, score in zip(moves, scores) if score == best])
+    return used.pick_edge(k)